@@ -0,0 +1,59 @@
+"""
+长对话历史的 rerun 耗时基准, 验证窗口化渲染后耗时不随历史长度增长
+
+python benchmarks/bench_history_render.py
+python benchmarks/bench_history_render.py --sizes 100 1000 10000 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+# chat_with_tools 在模块级创建客户端, 渲染历史不会真正请求接口
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from streamlit.testing.v1 import AppTest
+
+PAGES = ["pages/chat.py", "pages/chat_with_tools.py"]
+
+
+def make_history(n):
+    history = [{"role": "assistant", "content": "How can I help you?"}]
+    for i in range(n - 1):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"message {i} " + "lorem ipsum " * 20})
+    return history
+
+
+def bench(page, size, runs):
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=60)
+    at.session_state["chat_history"] = make_history(size)
+    at.run()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    assert not at.exception, at.exception
+    return statistics.median(timings), len(at.chat_message)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'page':<28}{'messages':>10}{'rendered':>10}{'median ms':>12}")
+    for page in PAGES:
+        for size in args.sizes:
+            median, rendered = bench(page, size, args.runs)
+            print(f"{page:<28}{size:>10}{rendered:>10}{median * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import streamlit as st
+from modules.rerun_profiler import slowest_pages, hot_functions, DB_PATH, SAMPLE_RATE
+from modules.session_memory import memory_stats
+
+st.title("⏱️ Rerun profiler")
+
+with st.expander("Session memory"):
+    st.write(memory_stats())
+st.caption(f"数据来源: {DB_PATH}, cProfile 采样率 {SAMPLE_RATE:.0%}")
+
+pages = slowest_pages()
+if not pages:
+    st.info("暂无数据, 打开其他页面后再回来查看")
+    st.stop()
+
+st.subheader("最慢的页面")
+st.dataframe(pages, use_container_width=True)
+
+page = st.selectbox("查看热点函数", [p["page"] for p in pages])
+functions, samples = hot_functions(page)
+st.caption(f"{samples} 次采样 rerun 的累计耗时")
+st.dataframe(functions, use_container_width=True)
@@ -1,4 +1,5 @@
 import streamlit as st
+from modules.warmup import start_warmup, warmup_status
 
 st.set_page_config(
     page_title="Hello",
@@ -9,6 +10,11 @@ st.write("# Welcome to Streamlit! 👋")
 
 st.sidebar.success("Select a demo above.")
 
+# 首次运行时在后台预热缓存和重型模块
+start_warmup()
+with st.sidebar.expander("Warm-up"):
+    st.write(warmup_status())
+
 st.markdown(
     """
     Streamlit is an open-source app framework built specifically for
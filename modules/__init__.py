@@ -1,11 +1,22 @@
+
 import streamlit as st
-import pandas as pd
-import numpy as np
 import time
+from modules.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
+# dataframe 不放进 __all__, 否则 from modules import * 会立即生成它并导入 pandas/numpy
+__all__ = ["st", "pd", "np", "time"]
 
 
-dataframe = pd.DataFrame(
-    np.random.randn(5, 10),
-    columns=["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"],
-)
+def __getattr__(name):
+    # dataframe 第一次被用到时才生成, 导入 modules 下的其他模块不再连带导入 pandas/numpy
+    if name == "dataframe":
+        value = pd.DataFrame(
+            np.random.randn(5, 10),
+            columns=["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"],
+        )
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,14 @@
+import streamlit as st
+
+from modules.warmup import warmup
+
+
+# We use @st.cache_data to keep the dataset in cache
+@warmup()
+@st.cache_data
+def get_stocks():
+    from vega_datasets import data
+
+    source = data.stocks()
+    source = source[source.date.gt("2004-01-01")]
+    return source
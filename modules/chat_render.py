@@ -0,0 +1,41 @@
+import json
+
+import streamlit as st
+
+# 长对话历史的窗口化渲染: 只渲染最近 window 条消息, 更早的消息点击 "加载更早消息" 再分页展开
+# reasoning 为 {消息下标: 思考过程}, 对应消息前显示折叠的思考区域
+
+WINDOW = 50
+PAGE_SIZE = 50
+
+
+def _to_markdown(content):
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return f"```json\n{json.dumps(content, ensure_ascii=False, indent=2, default=str)}\n```"
+
+
+def render_history(history, key="chat_history", window=WINDOW, page_size=PAGE_SIZE, reasoning=None, reasoning_label="💭 思考过程"):
+    """渲染 history 最后 window 条消息, 返回实际渲染的条数"""
+    visible_key = f"{key}_visible"
+    visible = max(st.session_state.get(visible_key, window), window)
+    if len(history) <= window:
+        visible = window
+    start = max(0, len(history) - visible)
+    if start > 0:
+        if st.button(f"加载更早消息 (还有 {start} 条)", key=f"{key}_load_earlier"):
+            visible += page_size
+            start = max(0, len(history) - visible)
+    st.session_state[visible_key] = visible
+
+    reasoning = reasoning or {}
+    for index in range(start, len(history)):
+        msg = history[index]
+        with st.chat_message(msg["role"]):
+            if reasoning.get(index):
+                with st.status(reasoning_label, state="complete", expanded=False):
+                    st.markdown(reasoning[index])
+            st.markdown(_to_markdown(msg.get("content")))
+    return len(history) - start
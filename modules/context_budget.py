@@ -0,0 +1,135 @@
+import functools
+import threading
+from collections import deque
+
+import streamlit as st
+
+from modules.model_prices import data_signature, load_model_data
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 按模型上下文窗口裁剪发送给 LLM 的历史消息
+# 每条消息的 token 数按内容缓存只计算一次; 从最早的轮次开始丢弃, system 消息和最新一轮始终保留,
+# assistant 的 tool_calls 与对应的 tool 消息作为整体保留或丢弃
+
+OUTPUT_RESERVE = 1024
+MESSAGE_OVERHEAD = 4
+IMAGE_TOKENS = 765
+
+_lock = threading.Lock()
+_reports = deque(maxlen=200)
+_totals = {"requests": 0, "trimmed_requests": 0, "saved_tokens": 0}
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _context_windows(signature):
+    data = load_model_data()
+    return {
+        name: info.get("max_input_tokens", info.get("max_tokens"))
+        for name, info in data.items()
+        if name != "sample_spec" and isinstance(info, dict)
+    }
+
+
+def load_context_windows():
+    """{模型名: 最大输入 tokens}, 价格数据文件变化后重新读取"""
+    try:
+        return _context_windows(data_signature())
+    except FileNotFoundError:
+        return {}
+
+
+def max_input_tokens(model):
+    return load_context_windows().get(model)
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    return tiktoken.get_encoding("o200k_base")
+
+
+@functools.lru_cache(maxsize=65536)
+def count_text_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        # 没有 tiktoken 时按 4 字符 1 token 估算
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def _content_tokens(content):
+    if not content:
+        return 0
+    if isinstance(content, str):
+        return count_text_tokens(content)
+    tokens = 0
+    for part in content:
+        if part.get("type") == "text":
+            tokens += count_text_tokens(part["text"])
+        elif part.get("type") in ("image_url", "image_ref"):
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+def count_message_tokens(msg):
+    tokens = MESSAGE_OVERHEAD + _content_tokens(msg.get("content"))
+    for tool_call in msg.get("tool_calls") or []:
+        tokens += count_text_tokens(tool_call["function"]["name"])
+        tokens += count_text_tokens(tool_call["function"]["arguments"])
+    return tokens
+
+
+def _group_turns(messages):
+    # tool 消息跟随在发起调用的 assistant 消息之后, 合并为一组
+    groups = []
+    for msg in messages:
+        if msg.get("role") == "tool" and groups:
+            groups[-1].append(msg)
+        else:
+            groups.append([msg])
+    return groups
+
+
+def fit_messages(messages, model, reserve=OUTPUT_RESERVE):
+    """返回裁剪后能放进 model 上下文窗口的消息列表, 未知模型原样返回"""
+    limit = max_input_tokens(model)
+    groups = _group_turns(messages)
+    sizes = [sum(count_message_tokens(m) for m in group) for group in groups]
+    total = sum(sizes)
+    sent = total
+    dropped = set()
+    if limit:
+        budget = limit - reserve
+        for i in range(len(groups) - 1):
+            if sent <= budget:
+                break
+            if groups[i][0].get("role") == "system":
+                continue
+            dropped.add(i)
+            sent -= sizes[i]
+    fitted = [m for i, group in enumerate(groups) if i not in dropped for m in group]
+    report = {
+        "model": model,
+        "max_input_tokens": limit,
+        "original_tokens": total,
+        "sent_tokens": sent,
+        "saved_tokens": total - sent,
+        "dropped_messages": len(messages) - len(fitted),
+    }
+    with _lock:
+        _reports.append(report)
+        _totals["requests"] += 1
+        _totals["saved_tokens"] += report["saved_tokens"]
+        if report["dropped_messages"]:
+            _totals["trimmed_requests"] += 1
+    return fitted
+
+
+def budget_stats():
+    with _lock:
+        return {**_totals, "last": _reports[-1] if _reports else None}
@@ -0,0 +1,171 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 工作负载成本预估
+# 按块流式读取每个请求的输入/输出 token 数 (CSV 或 JSONL; JSON 数组整体读取), 每块与所有模型的价格做广播 (请求数 x 模型数) 得到每个请求的成本;
+# 总成本直接累加, 分位数用对数分桶直方图近似 (每 10 倍 BINS_PER_DECADE 个桶, 相对误差约 2%), 内存只与块大小和模型数有关
+
+INPUT_COLUMNS = ["input_tokens", "prompt_tokens"]
+OUTPUT_COLUMNS = ["output_tokens", "completion_tokens"]
+# 每块 请求数 x 模型数 的上限, float64 约 32MB
+MAX_CELLS = 4 * 1024 * 1024
+READ_ROWS = 200_000
+# 单个请求成本的直方图范围 (美元)
+MIN_COST = 1e-9
+MAX_COST = 1e4
+BINS_PER_DECADE = 64
+PERCENTILES = [50, 90, 99]
+# 允许从服务器读取的工作负载目录, 未配置时只能上传文件
+WORKLOAD_DIR = os.getenv("STREAMLIT_DEMO_WORKLOAD_DIR")
+WORKLOAD_SUFFIXES = (".csv", ".jsonl", ".ndjson", ".json")
+
+
+def _column(columns, candidates):
+    for name in candidates:
+        if name in columns:
+            return name
+    raise ValueError(f"缺少列 {' / '.join(candidates)}")
+
+
+def _suffix(source):
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    return Path(str(name)).suffix.lower()
+
+
+def _read_json(source):
+    """整个 .json 文件: 请求对象数组"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            records = json.load(f)
+    else:
+        records = json.load(source)
+    if not isinstance(records, list):
+        raise ValueError("JSON 工作负载应为请求对象数组")
+    return [pd.DataFrame.from_records(records)]
+
+
+def workload_files():
+    """WORKLOAD_DIR 下可选的工作负载文件 (相对路径), 未配置时为空"""
+    if not WORKLOAD_DIR or not os.path.isdir(WORKLOAD_DIR):
+        return []
+    root = Path(WORKLOAD_DIR).resolve()
+    return sorted(
+        path.relative_to(root).as_posix()
+        for path in root.rglob("*")
+        if path.suffix.lower() in WORKLOAD_SUFFIXES and path.is_file() and path.resolve().is_relative_to(root)
+    )
+
+
+def resolve_workload(name):
+    """把 WORKLOAD_DIR 下的相对路径解析为绝对路径, 不允许通过 .. 或符号链接跳出该目录"""
+    if not WORKLOAD_DIR:
+        raise ValueError("未配置 STREAMLIT_DEMO_WORKLOAD_DIR")
+    root = Path(WORKLOAD_DIR).resolve()
+    path = (root / name).resolve()
+    if not path.is_relative_to(root) or path.suffix.lower() not in WORKLOAD_SUFFIXES or not path.is_file():
+        raise ValueError(f"不可用的工作负载文件: {name}")
+    return path
+
+
+def iter_workload(source, read_rows=READ_ROWS):
+    """
+    按块读取工作负载, 每次产生 (输入 tokens, 输出 tokens) 两个 int64 数组
+    source 可以是 DataFrame, CSV/JSONL/JSON 文件路径或文件对象 (如 st.file_uploader 的返回值);
+    JSON 数组需要整体解析, 只有 CSV/JSONL 按块流式读取
+    """
+    suffix = _suffix(source)
+    if isinstance(source, pd.DataFrame):
+        frames = [source]
+    elif suffix in (".jsonl", ".ndjson"):
+        frames = pd.read_json(source, lines=True, chunksize=read_rows, dtype=False)
+    elif suffix == ".json":
+        frames = _read_json(source)
+    else:
+        wanted = set(INPUT_COLUMNS + OUTPUT_COLUMNS)
+        frames = pd.read_csv(source, chunksize=read_rows, usecols=lambda name: name in wanted)
+    for frame in frames:
+        input_column = _column(frame.columns, INPUT_COLUMNS)
+        output_column = _column(frame.columns, OUTPUT_COLUMNS)
+        input_tokens = pd.to_numeric(frame[input_column], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+        output_tokens = pd.to_numeric(frame[output_column], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+        yield input_tokens, output_tokens
+
+
+class CostProjection:
+    """累加器: 对一组模型 (每 token 输入/输出价格) 逐块累计成本"""
+
+    def __init__(self, input_prices, output_prices):
+        self.input_prices = np.asarray(input_prices, dtype=np.float64)
+        self.output_prices = np.asarray(output_prices, dtype=np.float64)
+        self.models = len(self.input_prices)
+        self.chunk_rows = max(1, MAX_CELLS // max(1, self.models))
+        self.decades = np.log10(MAX_COST) - np.log10(MIN_COST)
+        # 第 0 个桶存放成本为 0 (或低于 MIN_COST) 的请求
+        self.bins = int(self.decades * BINS_PER_DECADE) + 1
+        self.histogram = np.zeros((self.models, self.bins), dtype=np.int64)
+        self.totals = np.zeros(self.models, dtype=np.float64)
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.requests = 0
+
+    def add(self, input_tokens, output_tokens):
+        input_tokens = np.asarray(input_tokens, dtype=np.float64)
+        output_tokens = np.asarray(output_tokens, dtype=np.float64)
+        offsets = np.arange(self.models) * self.bins
+        for start in range(0, len(input_tokens), self.chunk_rows):
+            inputs = input_tokens[start:start + self.chunk_rows]
+            outputs = output_tokens[start:start + self.chunk_rows]
+            # (请求数, 1) x (1, 模型数) -> (请求数, 模型数)
+            costs = inputs[:, None] * self.input_prices[None, :] + outputs[:, None] * self.output_prices[None, :]
+            self.totals += costs.sum(axis=0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                positions = ((np.log10(costs) - np.log10(MIN_COST)) * BINS_PER_DECADE).astype(np.int64)
+            bins = np.where(costs < MIN_COST, 0, np.clip(positions + 1, 1, self.bins - 1))
+            self.histogram += np.bincount((bins + offsets[None, :]).ravel(), minlength=self.models * self.bins).reshape(self.models, self.bins)
+            self.input_tokens += int(inputs.sum())
+            self.output_tokens += int(outputs.sum())
+            self.requests += len(inputs)
+
+    def percentile(self, q):
+        """每个模型单个请求成本的近似 q 分位数 (取所在桶的几何中点)"""
+        if not self.requests:
+            return np.zeros(self.models)
+        cumulative = self.histogram.cumsum(axis=1)
+        target = np.ceil(q / 100 * self.requests)
+        bins = (cumulative < np.maximum(target, 1)).sum(axis=1)
+        values = 10 ** (np.log10(MIN_COST) + (bins - 0.5) / BINS_PER_DECADE)
+        return np.where(bins == 0, 0.0, values)
+
+
+def project_costs(source, df, rows=None, percentiles=PERCENTILES):
+    """
+    计算工作负载在价格表中每个模型上的总成本和单次请求成本分位数, 按总成本从低到高排序
+    df 为 prepare_dataframe() 的价格表, rows 为参与计算的行号 (默认全部)
+    """
+    models = df if rows is None else df.iloc[rows]
+    projection = CostProjection(
+        models["输入价格(每百万tokens)"].to_numpy() / 1000000,
+        models["输出价格(每百万tokens)"].to_numpy() / 1000000,
+    )
+    for input_tokens, output_tokens in iter_workload(source):
+        projection.add(input_tokens, output_tokens)
+
+    result = pd.DataFrame({
+        "模型名称": models["模型名称"].to_numpy(),
+        "提供商": models["提供商"].to_numpy(),
+        "总成本($)": projection.totals,
+        "平均每请求成本($)": projection.totals / max(1, projection.requests),
+    })
+    for q in percentiles:
+        result[f"P{q} 每请求成本($)"] = projection.percentile(q)
+    result = result.sort_values("总成本($)", kind="stable").reset_index(drop=True)
+    summary = {
+        "requests": projection.requests,
+        "input_tokens": projection.input_tokens,
+        "output_tokens": projection.output_tokens,
+    }
+    return result, summary
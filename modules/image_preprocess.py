@@ -0,0 +1,87 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from modules.image_store import put_image
+
+# 发送给模型前的图片预处理: 按 EXIF 旋转, 缩放到模型实际使用的分辨率, 去掉元数据, 按目标大小重新编码
+# 结果按原图 sha256 缓存, 多张图片在线程池中并行处理
+
+# 高精度模式下模型会把图片缩放到 2048x2048 以内, 再把短边缩到 768
+MAX_LONG_SIDE = 2048
+MAX_SHORT_SIDE = 768
+TARGET_BYTES = 512 * 1024
+QUALITIES = [90, 80, 70, 60, 50]
+# 最低质量仍超过 TARGET_BYTES 时每次缩小的比例和最小短边
+SHRINK = 0.75
+MIN_SIDE = 256
+MAX_MEMO = 256
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image")
+_lock = threading.Lock()
+_memo = OrderedDict()
+
+
+def _resize(img):
+    width, height = img.size
+    scale = min(1.0, MAX_LONG_SIDE / max(width, height), MAX_SHORT_SIDE / min(width, height))
+    if scale < 1.0:
+        img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    return img
+
+
+def _save(img):
+    """有透明通道的保存为 PNG (过大时量化为调色板), 其他用 JPEG 逐步降低质量; 不写入任何元数据"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        candidates = [(img, {}), (img.quantize(256, method=Image.Quantize.FASTOCTREE), {})]
+        image_format, mime = "PNG", "image/png"
+    else:
+        img = img.convert("RGB")
+        candidates = [(img, {"quality": quality}) for quality in QUALITIES]
+        image_format, mime = "JPEG", "image/jpeg"
+    for candidate, options in candidates:
+        buffered = io.BytesIO()
+        candidate.save(buffered, format=image_format, optimize=True, **options)
+        if buffered.tell() <= TARGET_BYTES:
+            break
+    return buffered.getvalue(), mime
+
+
+def _encode(img):
+    """按 _save 编码, 仍超过 TARGET_BYTES 时继续缩小尺寸"""
+    while True:
+        encoded, mime = _save(img)
+        width, height = img.size
+        if len(encoded) <= TARGET_BYTES or min(width, height) <= MIN_SIDE:
+            return encoded, mime
+        img = img.resize((max(1, round(width * SHRINK)), max(1, round(height * SHRINK))), Image.LANCZOS)
+
+
+def preprocess_image(data):
+    """返回预处理后图片在 image_store 中的引用, 相同原图只处理一次"""
+    key = hashlib.sha256(data).hexdigest()
+    with _lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    with Image.open(io.BytesIO(data)) as raw:
+        img = _resize(ImageOps.exif_transpose(raw))
+        encoded, mime = _encode(img)
+    ref = put_image(encoded, mime)
+    with _lock:
+        _memo[key] = ref
+        while len(_memo) > MAX_MEMO:
+            _memo.popitem(last=False)
+    return ref
+
+
+def preprocess_images(images):
+    """并行处理多张图片 (字节列表), 按输入顺序返回引用"""
+    if len(images) == 1:
+        return [preprocess_image(images[0])]
+    return list(_executor.map(preprocess_image, images))
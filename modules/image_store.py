@@ -0,0 +1,81 @@
+import base64
+import functools
+import hashlib
+import os
+import threading
+
+from PIL import Image
+
+# 按内容寻址的图片存储
+# 图片按 sha256 存到磁盘一次, session_state 中只保存 {"sha256", "mime"} 引用;
+# 展示用的缩略图只生成一次, 发送给模型时才转换为 base64 data URL
+
+STORE_DIR = os.getenv("STREAMLIT_DEMO_IMAGE_STORE", ".cache/images")
+THUMBNAIL_SIZE = 512
+
+_lock = threading.Lock()
+
+_EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/jpg": "jpg", "image/webp": "webp", "image/gif": "gif"}
+
+
+def _path(sha256, mime):
+    return os.path.join(STORE_DIR, f"{sha256}.{_EXTENSIONS.get(mime, 'bin')}")
+
+
+def put_image(data, mime="image/jpeg"):
+    """保存图片字节, 返回引用; 相同内容只存一份"""
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = _path(sha256, mime)
+    with _lock:
+        if not os.path.exists(path):
+            os.makedirs(STORE_DIR, exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+    return {"sha256": sha256, "mime": mime}
+
+
+def image_path(ref):
+    return _path(ref["sha256"], ref["mime"])
+
+
+def thumbnail_path(ref, size=THUMBNAIL_SIZE):
+    """缩略图路径, 不存在时生成"""
+    path = os.path.join(STORE_DIR, f"{ref['sha256']}_{size}.png")
+    if os.path.exists(path):
+        return path
+    with Image.open(image_path(ref)) as img:
+        img.thumbnail((size, size))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        img.save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, path)
+    return path
+
+
+@functools.lru_cache(maxsize=32)
+def _data_url(sha256, mime):
+    with open(_path(sha256, mime), "rb") as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+
+def data_url(ref):
+    return _data_url(ref["sha256"], ref["mime"])
+
+
+def to_api_messages(messages):
+    """把消息中的 image_ref 展开成模型需要的 image_url, 其他内容原样返回"""
+    api_messages = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, list) and any(part.get("type") == "image_ref" for part in content):
+            content = [
+                {"type": "image_url", "image_url": {"url": data_url(part["image_ref"])}}
+                if part.get("type") == "image_ref" else part
+                for part in content
+            ]
+            message = {**message, "content": content}
+        api_messages.append(message)
+    return api_messages
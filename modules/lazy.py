@@ -0,0 +1,22 @@
+import importlib.util
+import sys
+
+# 延迟导入: 返回的模块对象在第一次访问属性时才真正执行导入
+
+
+def lazy_import(name):
+    """
+    pd = lazy_import("pandas")
+    已导入的模块直接返回; 子模块 (如 "plotly.express") 的父包会立即导入
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+import httpx
+from openai import OpenAI
+
+# 进程级共享的 OpenAI 客户端
+# Streamlit 每次 rerun 都会重新执行页面脚本, 在页面里直接 OpenAI() 会重建连接池,
+# 这里按 (api_key, base_url) 缓存, 超过 MAX_CLIENTS 时按 LRU 淘汰;
+# 被淘汰的客户端可能还在别的会话或后台线程 (流式响应, 转写, TTS) 中使用, 只丢弃引用不主动关闭,
+# 所有使用者都释放后连接随对象回收一起关闭
+
+MAX_CLIENTS = 8
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+
+_lock = threading.Lock()
+_clients = OrderedDict()
+_stats = {"requests": 0, "created": 0, "evicted": 0}
+
+
+def _build_client(api_key, base_url):
+    http_client = httpx.Client(limits=POOL_LIMITS, timeout=httpx.Timeout(60.0, connect=10.0))
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+
+def get_client(api_key=None, base_url=None):
+    """获取共享的 OpenAI 客户端, api_key/base_url 为空时使用环境变量"""
+    key = (api_key, base_url)
+    with _lock:
+        _stats["requests"] += 1
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _build_client(api_key, base_url)
+            _stats["created"] += 1
+            while len(_clients) > MAX_CLIENTS:
+                _clients.popitem(last=False)
+                _stats["evicted"] += 1
+        _clients.move_to_end(key)
+    return client
+
+
+def close_clients():
+    """关闭所有缓存的客户端, 只在进程退出或测试时使用"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+def _pool_connections(client):
+    # httpx 没有公开连接池状态, 只能从 transport 内部读取, 读不到时按没有连接处理
+    transport = getattr(getattr(client, "_client", None), "_transport", None)
+    connections = getattr(getattr(transport, "_pool", None), "connections", None)
+    try:
+        return list(connections or [])
+    except TypeError:
+        return []
+
+
+def _is_idle(connection):
+    try:
+        return bool(connection.is_idle())
+    except Exception:
+        return False
+
+
+def pool_stats():
+    """连接池使用情况: 客户端复用次数和已有客户端的 keep-alive 连接数"""
+    with _lock:
+        stats = dict(_stats)
+        clients = list(_clients.values())
+    stats["reused"] = stats["requests"] - stats["created"]
+    stats["clients"] = len(clients)
+    connections = [c for client in clients for c in _pool_connections(client)]
+    stats["connections"] = len(connections)
+    stats["idle_connections"] = sum(1 for c in connections if _is_idle(c))
+    return stats
@@ -0,0 +1,115 @@
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+
+import streamlit as st
+
+from modules.lazy import lazy_import
+from modules.warmup import warmup
+
+pd = lazy_import("pandas")
+
+MODEL_DATA_PATH = "data/model_prices_and_context_window.json"
+# 价格表的列式快照, 文件名带 JSON 的 mtime/大小签名, JSON 变化后自动失效
+SNAPSHOT_DIR = os.getenv("STREAMLIT_DEMO_PRICE_SNAPSHOT", ".cache/model_prices")
+
+_snapshot_lock = threading.Lock()
+
+
+def data_signature():
+    stat = os.stat(MODEL_DATA_PATH)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _load_json(signature):
+    with open(MODEL_DATA_PATH, "r") as f:
+        data = json.load(f)
+    return data
+
+
+@warmup()
+def load_model_data():
+    return _load_json(data_signature())
+
+
+def _build(data):
+    """一次性把 JSON 规整为带类型的列式表"""
+    raw = pd.DataFrame.from_dict(data, orient="index").drop(index="sample_spec", errors="ignore")
+    for column in ["input_cost_per_token", "output_cost_per_token", "max_tokens", "max_input_tokens", "max_output_tokens", "litellm_provider", "mode"]:
+        if column not in raw:
+            raw[column] = None
+    # 只保留有价格信息的模型
+    raw = raw[raw["input_cost_per_token"].notna() & raw["output_cost_per_token"].notna()]
+
+    def numeric(column):
+        return pd.to_numeric(raw[column], errors="coerce")
+
+    max_tokens = numeric("max_tokens")
+    df = pd.DataFrame({
+        "模型名称": raw.index.astype(str).to_numpy(),
+        "提供商": raw["litellm_provider"].fillna("未知").astype(str).astype("category"),
+        # 转换为每百万tokens的价格
+        "输入价格(每百万tokens)": numeric("input_cost_per_token").fillna(0).astype("float64") * 1000000,
+        "输出价格(每百万tokens)": numeric("output_cost_per_token").fillna(0).astype("float64") * 1000000,
+        "最大输入tokens": numeric("max_input_tokens").fillna(max_tokens).fillna(0).astype("int64"),
+        "最大输出tokens": numeric("max_output_tokens").fillna(max_tokens).fillna(0).astype("int64"),
+        "模式": raw["mode"].fillna("未知").astype(str).astype("category"),
+    })
+    return df.reset_index(drop=True)
+
+
+def _snapshot_path(signature):
+    digest = hashlib.sha256(f"{os.path.abspath(MODEL_DATA_PATH)}\0{signature}".encode()).hexdigest()[:16]
+    # 没有安装 pyarrow 时退回 pickle
+    suffix = "parquet" if importlib.util.find_spec("pyarrow") else "pkl"
+    return os.path.join(SNAPSHOT_DIR, f"{digest}.{suffix}")
+
+
+def _read_snapshot(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+    except Exception:
+        # 快照损坏时重新生成
+        return None
+
+
+def _write_snapshot(df, path):
+    with _snapshot_lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        for name in os.listdir(SNAPSHOT_DIR):
+            # 旧签名的快照已经失效
+            if not name.endswith(".tmp"):
+                os.remove(os.path.join(SNAPSHOT_DIR, name))
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        if path.endswith(".parquet"):
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _price_table(signature):
+    path = _snapshot_path(signature)
+    df = _read_snapshot(path)
+    if df is None:
+        df = _build(_load_json(signature))
+        try:
+            _write_snapshot(df, path)
+        except OSError:
+            pass
+    return df
+
+
+@warmup()
+def prepare_dataframe():
+    """
+    价格表, 所有会话和每次运行共享同一个 DataFrame (不复制), 调用方只能读取, 不要原地修改
+    列: 模型名称, 提供商(category), 输入/输出价格(float64), 最大输入/输出tokens(int64), 模式(category)
+    """
+    return _price_table(data_signature())
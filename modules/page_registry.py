@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import streamlit as st
+
+# 页面发现: 扫描 pages 目录 (含子目录), 按文件名前缀归入 Chat/Chart 分组, 其余归入 Other
+# 进程内缓存扫描结果 (页面路径列表), 只有目录 mtime 变化 (增删/重命名页面) 时才重新扫描, 且最多每 CHECK_INTERVAL 秒检查一次;
+# st.Page 带有每次运行的状态, 不能在会话之间共享, navigation_config() 每次运行都重新创建
+
+PAGES_DIR = "pages"
+SECTIONS = ["Chat", "Chart", "Other"]
+CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_cache = {"pages_dir": None, "signature": None, "dirs": [], "pages": None, "checked_at": 0.0}
+
+
+def _scan(pages_dir):
+    """返回 (页面路径列表, 扫描过的目录列表)"""
+    paths, dirs = [], []
+    for dirpath, dirnames, filenames in os.walk(pages_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "__")))
+        dirs.append(dirpath)
+        for f in filenames:
+            if f.endswith(".py"):
+                paths.append(os.path.join(dirpath, f).replace(os.sep, "/"))
+    return paths, dirs
+
+
+def _signature(dirs):
+    return tuple((d, os.stat(d).st_mtime_ns) for d in dirs)
+
+
+def discover_pages(pages_dir=PAGES_DIR):
+    """返回 {分组: [页面脚本路径, ...]}"""
+    config = {i: [] for i in SECTIONS}
+    for path in _scan(pages_dir)[0]:
+        f = os.path.basename(path)
+        for k in SECTIONS[:-1]:
+            if f.startswith(k.lower()):
+                config[k].append(path)
+                break
+        else:
+            config["Other"].append(path)
+    return config
+
+
+def _url_path(path, pages_dir):
+    # 子目录中的页面加上目录前缀, 避免与顶层同名页面冲突
+    relative = os.path.relpath(path, pages_dir)[:-len(".py")]
+    return relative.replace(os.sep, "_").replace("/", "_")
+
+
+def _discover(pages_dir):
+    return {
+        section: [(path, _url_path(path, pages_dir)) for path in paths]
+        for section, paths in discover_pages(pages_dir).items()
+    }
+
+
+def _changed():
+    # 只 stat 上次扫描到的目录; 新建子目录会改变其父目录的 mtime
+    try:
+        return _signature(_cache["dirs"]) != _cache["signature"]
+    except FileNotFoundError:
+        return True
+
+
+def cached_pages(pages_dir=PAGES_DIR):
+    """进程内共享的 {分组: [(页面路径, url_path), ...]}, 调用方不要修改返回值"""
+    now = time.monotonic()
+    with _lock:
+        fresh = _cache["pages"] is not None and _cache["pages_dir"] == pages_dir
+        if fresh and now - _cache["checked_at"] < CHECK_INTERVAL:
+            return _cache["pages"]
+        _cache["checked_at"] = now
+        if not fresh or _changed():
+            dirs = _scan(pages_dir)[1]
+            _cache["pages"] = _discover(pages_dir)
+            _cache["pages_dir"] = pages_dir
+            _cache["dirs"] = dirs
+            _cache["signature"] = _signature(dirs)
+        return _cache["pages"]
+
+
+def navigation_config(pages_dir=PAGES_DIR):
+    """本次运行使用的 {分组: [st.Page, ...]}"""
+    return {
+        section: [st.Page(path, url_path=url_path) for path, url_path in pages]
+        for section, pages in cached_pages(pages_dir).items()
+    }
@@ -0,0 +1,106 @@
+import functools
+
+import numpy as np
+import streamlit as st
+
+from modules.model_prices import data_signature, prepare_dataframe
+
+# 价格表的预计算索引
+# 提供商/模式为倒排表 (有序行号数组), 多个条件取交集; 模型名称按 3-gram 建倒排表, 搜索时先取交集得到候选再校验子串;
+# 查询结果只是行号数组, 按查询缓存, 不复制共享的 DataFrame
+
+NGRAM = 3
+MAX_QUERIES = 512
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+def _postings(values):
+    """{值: 有序行号数组}"""
+    postings = {}
+    for row, value in enumerate(values):
+        postings.setdefault(value, []).append(row)
+    return {value: _frozen(np.asarray(rows, dtype=np.int64)) for value, rows in postings.items()}
+
+
+class PriceIndex:
+    def __init__(self, df, sort_by="输入价格(每百万tokens)"):
+        self.size = len(df)
+        self.names = [name.lower() for name in df["模型名称"].tolist()]
+        self.providers = _postings(df["提供商"].astype(str).tolist())
+        self.modes = _postings(df["模式"].astype(str).tolist())
+        grams = {}
+        for row, name in enumerate(self.names):
+            for gram in {name[i:i + NGRAM] for i in range(len(name) - NGRAM + 1)}:
+                grams.setdefault(gram, []).append(row)
+        self.grams = {gram: _frozen(np.asarray(rows, dtype=np.int64)) for gram, rows in grams.items()}
+        # 默认排序 (价格从高到低) 下每一行的名次
+        order = np.argsort(-df[sort_by].to_numpy(), kind="stable")
+        self.price_rank = np.empty(self.size, dtype=np.int64)
+        self.price_rank[order] = np.arange(self.size)
+        # 每个索引单独缓存查询结果, 数据文件更新后旧索引连同缓存一起释放
+        self._query = functools.lru_cache(maxsize=MAX_QUERIES)(self._run_query)
+
+    def _intersect(self, arrays):
+        arrays = sorted(arrays, key=len)
+        result = arrays[0]
+        for array in arrays[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, array, assume_unique=True)
+        return result
+
+    def filter_rows(self, provider=None, mode=None):
+        """按提供商/模式过滤, None 表示不限; 返回按默认排序排列的行号"""
+        return self._query(provider, mode, "")
+
+    def search(self, provider=None, mode=None, query=""):
+        """过滤后再按模型名称子串搜索 (不区分大小写); 返回按相关度排序的行号"""
+        return self._query(provider, mode, query.strip().lower())
+
+    def _run_query(self, provider, mode, query):
+        arrays = []
+        if provider is not None:
+            arrays.append(self.providers.get(provider, np.empty(0, dtype=np.int64)))
+        if mode is not None:
+            arrays.append(self.modes.get(mode, np.empty(0, dtype=np.int64)))
+        if query and len(query) >= NGRAM:
+            grams = {query[i:i + NGRAM] for i in range(len(query) - NGRAM + 1)}
+            arrays.extend(self.grams.get(gram, np.empty(0, dtype=np.int64)) for gram in grams)
+        rows = self._intersect(arrays) if arrays else np.arange(self.size)
+
+        if not query:
+            return _frozen(rows[np.argsort(self.price_rank[rows], kind="stable")])
+
+        # 3-gram 只能筛出候选, 还要校验子串; 不足 3 个字符的查询直接扫描过滤后的行
+        names = self.names
+        matches = [(row, names[row].find(query)) for row in rows.tolist()]
+        matches = [(row, position) for row, position in matches if position >= 0]
+        # 完全匹配 > 前缀匹配 > 匹配位置靠前 > 名称短 > 价格高
+        matches.sort(key=lambda m: (names[m[0]] != query, m[1] != 0, m[1], len(names[m[0]]), self.price_rank[m[0]]))
+        return _frozen(np.asarray([row for row, _ in matches], dtype=np.int64))
+
+    def stats(self):
+        info = self._query.cache_info()
+        total = info.hits + info.misses
+        return {
+            "rows": self.size,
+            "ngrams": len(self.grams),
+            "cached_queries": info.currsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / total if total else 0.0,
+        }
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _price_index(signature):
+    return PriceIndex(prepare_dataframe())
+
+
+def price_index():
+    """与 prepare_dataframe() 对应的索引, 价格数据文件变化后重新构建"""
+    return _price_index(data_signature())
@@ -0,0 +1,119 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import sqlite3
+import threading
+import time
+
+# 可选的 rerun 性能分析: 设置环境变量 STREAMLIT_DEMO_PROFILE=1 后, page_main.py 中的 pg.run()
+# 会记录每次 rerun 的墙钟时间, 线程 CPU 时间, 并按采样率用 cProfile 记录热点函数, 写入有上限的 sqlite
+
+ENABLED = os.getenv("STREAMLIT_DEMO_PROFILE", "") not in ("", "0")
+SAMPLE_RATE = float(os.getenv("STREAMLIT_DEMO_PROFILE_SAMPLE", "0.2"))
+DB_PATH = os.getenv("STREAMLIT_DEMO_PROFILE_DB", ".profile/reruns.sqlite")
+MAX_ROWS = 5000
+TOP_FUNCTIONS = 30
+
+# cProfile 同一时间只能有一个在运行, 其他会话的 rerun 只记录耗时
+_profiler_lock = threading.Lock()
+_db_lock = threading.Lock()
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS reruns ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, page TEXT, "
+        "wall_seconds REAL, cpu_seconds REAL, functions TEXT)"
+    )
+    return conn
+
+
+def _hot_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, lineno, name), (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({os.path.relpath(filename) if os.path.isabs(filename) else filename}:{lineno})",
+            "calls": nc,
+            "tottime": round(tt, 6),
+            "cumtime": round(ct, 6),
+        })
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _save(page, wall, cpu, functions):
+    with _db_lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO reruns (ts, page, wall_seconds, cpu_seconds, functions) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), page, wall, cpu, json.dumps(functions) if functions else None),
+            )
+            conn.execute("DELETE FROM reruns WHERE id <= (SELECT MAX(id) FROM reruns) - ?", (MAX_ROWS,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def run_page(pg):
+    """代替 pg.run(), 未开启时直接运行"""
+    if not ENABLED:
+        pg.run()
+        return
+    profiler = None
+    if random.random() < SAMPLE_RATE and _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        if profiler:
+            profiler.enable()
+        pg.run()
+    finally:
+        # st.rerun()/st.stop() 通过异常结束脚本, 同样需要记录
+        if profiler:
+            profiler.disable()
+            _profiler_lock.release()
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+        _save(pg.url_path or pg.title, wall, cpu, _hot_functions(profiler) if profiler else None)
+
+
+def slowest_pages(limit=20):
+    with _db_lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT page, COUNT(*), AVG(wall_seconds), MAX(wall_seconds), AVG(cpu_seconds) "
+                "FROM reruns GROUP BY page ORDER BY AVG(wall_seconds) DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+    return [
+        {"page": page, "reruns": n, "avg_wall_ms": avg * 1000, "max_wall_ms": worst * 1000, "avg_cpu_ms": cpu * 1000}
+        for page, n, avg, worst, cpu in rows
+    ]
+
+
+def hot_functions(page, limit=TOP_FUNCTIONS):
+    """汇总某页面所有采样 rerun 的热点函数, 按累计耗时排序"""
+    with _db_lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT functions FROM reruns WHERE page = ? AND functions IS NOT NULL", (page,)
+            ).fetchall()
+        finally:
+            conn.close()
+    merged = {}
+    for (functions,) in rows:
+        for f in json.loads(functions):
+            item = merged.setdefault(f["function"], {"function": f["function"], "calls": 0, "tottime": 0.0, "cumtime": 0.0})
+            item["calls"] += f["calls"]
+            item["tottime"] += f["tottime"]
+            item["cumtime"] += f["cumtime"]
+    return sorted(merged.values(), key=lambda r: r["cumtime"], reverse=True)[:limit], len(rows)
@@ -0,0 +1,65 @@
+import time
+
+import streamlit as st
+
+# 按对话轮次统计脚本运行次数和耗时
+# 页面顶部调用 begin_run(), 脚本末尾调用 end_run(), 用 rerun()/stop() 代替 st.rerun()/st.stop(),
+# 用户发送新消息时调用 new_turn(); 被 widget 触发的 rerun 打断的运行没有执行到 end_run, 在下一次 begin_run 时结束
+
+KEY = "rerun_stats"
+MAX_TURNS = 20
+
+
+def _stats():
+    if KEY not in st.session_state:
+        st.session_state[KEY] = {"runs": 0, "interrupted": 0, "script_seconds": 0.0, "turns": [], "_start": None}
+    stats = st.session_state[KEY]
+    stats.setdefault("interrupted", 0)
+    return stats
+
+
+def begin_run():
+    stats = _stats()
+    now = time.perf_counter()
+    if stats["_start"] is not None:
+        # 上一次运行被打断, 新的运行紧接着开始, 以现在作为它的结束时间
+        stats["script_seconds"] += now - stats["_start"]
+        stats["interrupted"] += 1
+    stats["runs"] += 1
+    stats["_start"] = now
+
+
+def end_run():
+    stats = _stats()
+    if stats["_start"] is not None:
+        stats["script_seconds"] += time.perf_counter() - stats["_start"]
+        stats["_start"] = None
+
+
+def rerun(**kwargs):
+    end_run()
+    st.rerun(**kwargs)
+
+
+def stop():
+    end_run()
+    st.stop()
+
+
+def new_turn():
+    """归档上一轮的统计, 当前这次运行计入新一轮"""
+    stats = _stats()
+    if stats["runs"] > 1:
+        stats["turns"].append({"runs": stats["runs"] - 1, "interrupted": stats["interrupted"], "script_seconds": round(stats["script_seconds"], 4)})
+        del stats["turns"][:-MAX_TURNS]
+    stats["runs"] = 1
+    stats["interrupted"] = 0
+    stats["script_seconds"] = 0.0
+
+
+def turn_stats():
+    stats = _stats()
+    return {
+        "current": {"runs": stats["runs"], "interrupted": stats["interrupted"], "script_seconds": round(stats["script_seconds"], 4)},
+        "turns": list(stats["turns"]),
+    }
@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import time
+
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# 会话内存统计与上限
+# 每次运行时测量当前会话 session_state 各个 key 的深度大小, 汇总到进程级登记表;
+# 会话上限取 SESSION_CAP 与进程总上限下的水位线 (只压低占用最多的会话) 中较小的一个, 且不低于 MIN_SESSION_CAP;
+# 超过上限时只裁剪 DATA_KEYS 中的消息列表 (去掉最早的消息, 至少保留最后一条), 控件状态等其他 key 只统计不删除
+# main.py 的多页面模式没有所有页面共用的入口, 写入 DATA_KEYS 的页面各自在开头调用 enforce_memory()
+
+SESSION_CAP = int(os.getenv("STREAMLIT_DEMO_SESSION_CAP_MB", "64")) * 1024 * 1024
+PROCESS_CAP = int(os.getenv("STREAMLIT_DEMO_PROCESS_CAP_MB", "1024")) * 1024 * 1024
+MIN_SESSION_CAP = 1024 * 1024
+MEASURE_INTERVAL = 2.0
+# 无法确认会话是否还在时 (如 bare 模式), 超过该时间未运行的会话不再计入进程总量
+SESSION_TTL = 300
+# 可以裁剪的消息列表; 值为按消息下标保存附加信息的 dict, 裁剪后下标随之平移
+DATA_KEYS = {"chat_history": ["chat_reasoning"], "messages": []}
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def deep_size(obj, seen=None):
+    """对象及其引用的容器/属性的总大小 (字节), 共享对象只计一次"""
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            stack.append(obj.__dict__)
+    return size
+
+
+def _measure(state):
+    # 所有 key 共用一个 seen, 多个 key 引用同一对象时只计一次
+    seen = set()
+    return {key: deep_size(state[key], seen) for key in list(state.keys())}
+
+
+def _trim(state, key, excess):
+    """从消息列表开头去掉约 excess 字节的消息, 返回去掉的条数"""
+    value = state[key]
+    # 按平均大小估算需要去掉的条数, 保留最后一条
+    per_item = max(1, deep_size(value) // len(value))
+    drop = min(len(value) - 1, max(1, -(-excess // per_item)))
+    # 不能以没有对应 tool_calls 的 tool 消息开头
+    while drop < len(value) - 1 and isinstance(value[drop], dict) and value[drop].get("role") == "tool":
+        drop += 1
+    del value[:drop]
+    for aligned in DATA_KEYS[key]:
+        extra = state.get(aligned)
+        if isinstance(extra, dict):
+            state[aligned] = {i - drop: v for i, v in extra.items() if isinstance(i, int) and i >= drop}
+    return drop
+
+
+def _trimmable(state, key):
+    value = state.get(key)
+    return isinstance(value, list) and len(value) > 1
+
+
+def _level(sizes, capacity):
+    """水位线: 每个会话最多占用 level 字节时总量不超过 capacity"""
+    remaining = len(sizes)
+    for size in sorted(sizes):
+        if size * remaining > capacity:
+            return capacity // remaining
+        capacity -= size
+        remaining -= 1
+    return None
+
+
+def cap_for(session_id, size, session_cap=SESSION_CAP, process_cap=PROCESS_CAP):
+    """当前会话的上限; 进程总量超限时只压低占用最多的会话, 不会压到 MIN_SESSION_CAP 以下"""
+    with _lock:
+        others = [sum(e["sizes"].values()) for s, e in _sessions.items() if s != session_id]
+    level = _level(others + [size], process_cap)
+    if level is None:
+        return session_cap
+    return min(session_cap, max(level, MIN_SESSION_CAP))
+
+
+def _alive(session_id, entry, now):
+    if runtime.exists():
+        return runtime.get_instance().is_active_session(session_id)
+    return now - entry["measured_at"] <= SESSION_TTL
+
+
+def enforce(session_id, state, session_cap=SESSION_CAP, process_cap=PROCESS_CAP):
+    """测量 state 并按上限裁剪消息列表, 返回 {key: 字节数}"""
+    now = time.monotonic()
+    with _lock:
+        entry = _sessions.get(session_id)
+        if entry and now - entry["measured_at"] < MEASURE_INTERVAL:
+            return entry["sizes"]
+        for dead in [s for s, e in _sessions.items() if s != session_id and not _alive(s, e, now)]:
+            del _sessions[dead]
+
+    sizes = _measure(state)
+    cap = cap_for(session_id, sum(sizes.values()), session_cap, process_cap)
+    evicted = []
+    while sum(sizes.values()) > cap:
+        candidates = [key for key in DATA_KEYS if key in sizes and _trimmable(state, key)]
+        if not candidates:
+            break
+        key = max(candidates, key=sizes.get)
+        _trim(state, key, sum(sizes.values()) - cap)
+        evicted.append(key)
+        sizes = _measure(state)
+
+    with _lock:
+        _sessions[session_id] = {"sizes": sizes, "measured_at": now, "evicted": evicted, "cap": cap}
+    return sizes
+
+
+def enforce_memory(session_cap=SESSION_CAP, process_cap=PROCESS_CAP):
+    """测量当前会话的 session_state 并按上限裁剪, 返回 {key: 字节数}"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return {}
+    return enforce(ctx.session_id, st.session_state, session_cap, process_cap)
+
+
+def memory_stats():
+    """进程内所有会话的内存占用"""
+    with _lock:
+        sessions = {
+            session_id: {
+                "total_bytes": sum(e["sizes"].values()),
+                "cap_bytes": e["cap"],
+                "largest": max(e["sizes"], key=e["sizes"].get, default=None),
+                "evicted": e["evicted"],
+            }
+            for session_id, e in _sessions.items()
+        }
+    return {
+        "sessions": len(sessions),
+        "total_bytes": sum(s["total_bytes"] for s in sessions.values()),
+        "session_cap_bytes": SESSION_CAP,
+        "process_cap_bytes": PROCESS_CAP,
+        "by_session": sessions,
+    }
+
+
+def session_memory():
+    """当前会话各 key 的大小"""
+    ctx = get_script_run_ctx()
+    with _lock:
+        entry = _sessions.get(ctx.session_id) if ctx else None
+    return dict(entry["sizes"]) if entry else {}
@@ -0,0 +1,140 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+# 流式响应的耗时统计: 请求开始, 首 token 时间, chunk 间隔, 吞吐 (每秒 chunk 数), tool_call 组装耗时
+# 只有 role 等字段、没有内容的空 chunk 不计入; 每次请求一条记录, 存在进程内的环形缓冲区里, 侧边栏展示分位数并可导出 JSONL
+
+MAX_RECORDS = 1000
+
+_lock = threading.Lock()
+_records = deque(maxlen=MAX_RECORDS)
+
+
+def _has_content(chunk):
+    if isinstance(chunk, dict):
+        return any(chunk.values())
+    return bool(chunk)
+
+
+def _close(record, start, chunks, gaps):
+    total = time.perf_counter() - start
+    record["total_seconds"] = total
+    record["chunks"] = chunks
+    if gaps:
+        record["mean_gap_seconds"] = sum(gaps) / len(gaps)
+        record["max_gap_seconds"] = max(gaps)
+    if chunks and "ttft_seconds" in record and total > record["ttft_seconds"]:
+        record["chunks_per_second"] = chunks / (total - record["ttft_seconds"])
+    with _lock:
+        _records.append(record)
+
+
+def timed_stream(stream, name, model=None):
+    """
+    包装生成器, 原样透传 chunk, 结束后写入一条记录
+    最后的 tool_call 列表 (ToolCalls) 产出前就写入记录: 调用方拿到它后通常不再迭代, 而是直接执行工具;
+    只返回 tool_call 的流以第一个 tool_call delta 到达的时刻作为首 token
+    """
+    record = {"name": name, "model": model, "started_at": time.time()}
+    start = time.perf_counter()
+    last = None
+    gaps = []
+    chunks = 0
+    closed = False
+    try:
+        for chunk in stream:
+            now = time.perf_counter()
+            if isinstance(chunk, list):
+                record["tool_calls"] = len(chunk)
+                record["tool_call_assembly_seconds"] = getattr(chunk, "assembly_seconds", None)
+                first_delta_at = getattr(chunk, "first_delta_at", None)
+                if "ttft_seconds" not in record and first_delta_at is not None:
+                    record["ttft_seconds"] = max(0.0, first_delta_at - start)
+                closed = True
+                _close(record, start, chunks, gaps)
+            elif _has_content(chunk):
+                if last is None:
+                    record["ttft_seconds"] = now - start
+                else:
+                    gaps.append(now - last)
+                last = now
+                chunks += 1
+            yield chunk
+    finally:
+        if not closed:
+            _close(record, start, chunks, gaps)
+
+
+def timed(name):
+    """
+    装饰返回生成器的函数, 记录名称为 name, 模型取自 model 参数或 model_params["model"]
+    @timed("chat_with_tools")
+    def chat_stream(messages, model="gpt-4o-mini", ...): ...
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            model = bound.arguments.get("model")
+            if model is None and isinstance(bound.arguments.get("model_params"), dict):
+                model = bound.arguments["model_params"].get("model")
+            return timed_stream(func(*args, **kwargs), name, model)
+
+        return wrapper
+
+    return decorator
+
+
+def records():
+    with _lock:
+        return list(_records)
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def summary():
+    """按 名称/模型 汇总 p50/p95/p99"""
+    groups = {}
+    for record in records():
+        groups.setdefault((record["name"], record["model"]), []).append(record)
+    rows = []
+    for (name, model), items in groups.items():
+        row = {"name": name, "model": model, "requests": len(items)}
+        for field in ["ttft_seconds", "total_seconds", "mean_gap_seconds", "chunks_per_second", "tool_call_assembly_seconds"]:
+            values = [r[field] for r in items if r.get(field) is not None]
+            if values:
+                for q in (50, 95, 99):
+                    row[f"{field}_p{q}"] = round(_percentile(values, q), 4)
+        rows.append(row)
+    return rows
+
+
+def export_jsonl(path=None):
+    """导出记录为 JSONL, 给定 path 时追加写入文件"""
+    text = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records())
+    if path:
+        with open(path, "a") as f:
+            f.write(text)
+    return text
+
+
+def metrics_panel():
+    with st.sidebar.expander("Stream metrics"):
+        rows = summary()
+        if not rows:
+            st.caption("暂无数据")
+            return
+        st.dataframe(rows, use_container_width=True)
+        st.download_button("导出 JSONL", export_jsonl(), file_name="stream_metrics.jsonl", mime="application/jsonl")
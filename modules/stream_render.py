@@ -0,0 +1,123 @@
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+# 合并流式输出: chunk 先放进列表, 距上次刷新超过 interval 秒或缓冲超过 flush_chars 个字符才写一次占位符,
+# 避免每个 token 都把完整文本重新发送到前端; 流停顿时由定时器在 interval 后补一次刷新, 缓冲的文本不会一直不显示
+
+INTERVAL = 0.05
+FLUSH_CHARS = 2048
+
+
+class CoalescingWriter:
+    """
+    writer = CoalescingWriter(st.empty())
+    for chunk in stream:
+        writer.append(chunk)
+    text = writer.flush()
+    """
+
+    def __init__(self, placeholder=None, initial="", interval=INTERVAL, flush_chars=FLUSH_CHARS):
+        self.placeholder = placeholder if placeholder is not None else st.empty()
+        self.interval = interval
+        self.flush_chars = flush_chars
+        self.flushes = 0
+        self._text = initial
+        self._buffer = []
+        self._buffered = 0
+        # 第一个 chunk 立即刷新
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def text(self):
+        if self._buffer:
+            return self._text + "".join(self._buffer)
+        return self._text
+
+    def append(self, chunk):
+        with self._lock:
+            self._buffer.append(chunk)
+            self._buffered += len(chunk)
+            wait = self.interval - (time.monotonic() - self._last_flush)
+            if self._buffered < self.flush_chars and wait > 0:
+                # 下一个 chunk 可能迟迟不来, 到时间后由定时器刷新
+                if self._timer is None:
+                    self._timer = add_script_run_ctx(threading.Timer(wait, self._flush_late))
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            self._flush()
+
+    def _flush_late(self):
+        with self._lock:
+            self._timer = None
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            self._text += "".join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self.placeholder.markdown(self._text)
+            self.flushes += 1
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+            return self._text
+
+
+def _route_reasoning(chunk):
+    if isinstance(chunk, dict):
+        return "reasoning", chunk.get("reasoning_content") or ""
+    return "answer", chunk
+
+
+def write_channels(stream, placeholders, route, **kwargs):
+    """
+    单次遍历 stream, 按 route(chunk) -> (channel, text) 分发到各自的占位符, 返回 {channel: text}
+    route 返回的 channel 不在 placeholders 中时丢弃该 chunk
+    """
+    writers = {name: CoalescingWriter(placeholder, **kwargs) for name, placeholder in placeholders.items()}
+    for chunk in stream:
+        channel, text = route(chunk)
+        if channel in writers and text:
+            writers[channel].append(text)
+    return {name: writer.flush() for name, writer in writers.items()}
+
+
+def write_reasoning_stream(stream, label="💭 思考过程", **kwargs):
+    """
+    推理内容 ({"reasoning_content": ...}) 实时写入思考区域, 普通字符串写入回答区域
+    思考区域在推理阶段展开, 回答开始后自动折叠; 返回 (reasoning_text, answer_text)
+    """
+    status = st.status(label, expanded=True)
+    with status:
+        reasoning_placeholder = st.empty()
+    answer_placeholder = st.empty()
+
+    def collapse_on_answer(chunks):
+        collapsed = False
+        for chunk in chunks:
+            if not collapsed and isinstance(chunk, str) and chunk:
+                status.update(expanded=False, state="complete")
+                collapsed = True
+            yield chunk
+        if not collapsed:
+            status.update(expanded=False, state="complete")
+
+    texts = write_channels(
+        collapse_on_answer(stream),
+        {"reasoning": reasoning_placeholder, "answer": answer_placeholder},
+        _route_reasoning,
+        **kwargs,
+    )
+    return texts["reasoning"], texts["answer"]
@@ -0,0 +1,95 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# 幂等工具的结果缓存, 进程内所有会话共享
+# key 为 工具名 + 归一化参数 (补齐默认值, 字符串去空白并转小写), TTL 过期 + LRU 淘汰
+
+MAX_ENTRIES = 1024
+
+
+class ToolCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+tool_cache = ToolCache()
+
+
+def normalize_value(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def make_key(name, func, args, kwargs, normalize=normalize_value):
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    normalized = {k: normalize(v) for k, v in bound.arguments.items()}
+    return name + ":" + json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def cacheable(ttl=300, name=None, normalize=normalize_value, cache=tool_cache):
+    """
+    声明工具结果可缓存, 仅用于无副作用的工具
+    @cacheable(ttl=600)
+    def get_current_weather(location, unit="fahrenheit"): ...
+    """
+    def decorator(func):
+        tool_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(tool_name, func, args, kwargs, normalize)
+            item = cache.get(key)
+            if item is not None:
+                return item[1]
+            result = func(*args, **kwargs)
+            cache.set(key, result, ttl)
+            return result
+
+        wrapper.cache_ttl = ttl
+        return wrapper
+
+    return decorator
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# 同一轮 assistant 返回的多个 tool_call 并发执行, 总耗时取决于最慢的那个工具
+# 线程池进程内共享, 不随页面 rerun 重建; 超时的调用会被取消, 还在排队的不再执行,
+# 工具内部访问外部服务时应使用 remaining_timeout() 作为客户端超时, 避免卡住的工具长期占用线程
+
+DEFAULT_TIMEOUT = 30
+MAX_WORKERS = 16
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="tool")
+_local = threading.local()
+
+
+class ToolError(Exception):
+    """工具未知、超时等执行之外的错误, 消息直接作为 tool 消息内容"""
+
+
+def parse_arguments(tool_call):
+    return json.loads(tool_call["function"]["arguments"] or "{}")
+
+
+def remaining_timeout(default=DEFAULT_TIMEOUT):
+    """当前工具调用剩余的时间 (秒), 不在工具线程中调用时返回 default"""
+    deadline = getattr(_local, "deadline", None)
+    if deadline is None:
+        return default
+    return max(0.0, deadline - time.monotonic())
+
+
+def _call(hooks, function_name, function_args, deadline):
+    if function_name not in hooks:
+        raise ToolError(f"Error: unknown tool {function_name}.")
+    if time.monotonic() >= deadline:
+        # 排队期间已经超时, 调用方不再等待结果
+        raise ToolError(f"Error: tool {function_name} timed out.")
+    _local.deadline = deadline
+    try:
+        return hooks[function_name](**function_args)
+    finally:
+        _local.deadline = None
+
+
+def _timeout_for(timeout, function_name):
+    if isinstance(timeout, dict):
+        return timeout.get(function_name, DEFAULT_TIMEOUT)
+    return timeout
+
+
+def submit_tool_call(tool_call, hooks, timeout=DEFAULT_TIMEOUT):
+    """提交单个工具调用, 返回 (function_args, future); 参数解析失败时 future 为 None"""
+    function_name = tool_call["function"]["name"]
+    try:
+        function_args = parse_arguments(tool_call)
+    except json.JSONDecodeError:
+        return None, None
+    deadline = time.monotonic() + _timeout_for(timeout, function_name)
+    return function_args, _executor.submit(_call, hooks, function_name, function_args, deadline)
+
+
+def tool_result(tool_call, future, timeout=DEFAULT_TIMEOUT, deadline=None):
+    """等待工具结果; 工具出错时抛出原异常, 超时时取消调用并抛出 ToolError"""
+    function_name = tool_call["function"]["name"]
+    if deadline is None:
+        deadline = time.monotonic() + _timeout_for(timeout, function_name)
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic()))
+    except TimeoutError:
+        # 线程无法强制中止, 还在排队的调用直接取消, 正在执行的结果丢弃
+        future.cancel()
+        raise ToolError(f"Error: tool {function_name} timed out.") from None
+
+
+def collect_tool_call(tool_call, function_args, future, timeout=DEFAULT_TIMEOUT, deadline=None):
+    """等待工具结果, 组装成 chat_history 需要的 tool 消息"""
+    function_name = tool_call["function"]["name"]
+    if future is None:
+        content = f"Error: Invalid arguments format for tool {function_name}."
+    else:
+        try:
+            content = tool_result(tool_call, future, timeout, deadline)
+        except ToolError as e:
+            content = str(e)
+        except Exception as e:
+            content = f"工具 {function_name} 执行错误: {str(e)}"
+    return function_args, {
+        "tool_call_id": tool_call["id"],
+        "role": "tool",
+        "name": function_name,
+        "content": content,
+    }
+
+
+def execute_tool_calls(tool_calls, hooks, timeout=DEFAULT_TIMEOUT, submitted=None):
+    """
+    并发执行 tool_calls, 按原 tool_call 顺序返回 [(function_args, tool_message), ...]
+    timeout 可以是秒数, 也可以是 {工具名: 秒数}
+    submitted 为 {tool_call_id: (function_args, future)}, 流式阶段已提前提交的不会重复执行
+    """
+    start = time.monotonic()
+    submitted = submitted or {}
+    pending = [
+        submitted.get(tool_call["id"]) or submit_tool_call(tool_call, hooks, timeout)
+        for tool_call in tool_calls
+    ]
+    results = []
+    for tool_call, (function_args, future) in zip(tool_calls, pending):
+        deadline = start + _timeout_for(timeout, tool_call["function"]["name"])
+        results.append(collect_tool_call(tool_call, function_args, future, deadline=deadline))
+    return results
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from modules.tool_executor import submit_tool_call
+
+# 等待用户确认期间, 先在后台执行无副作用的工具
+# 用户确认时直接取结果, 拒绝时丢弃; 推测结果按 (会话, tool_call_id) 存放在进程内, 有数量上限;
+# 不同会话发出相同请求时 (如回放服务) tool_call_id 可能相同, 必须带上会话区分
+
+MAX_SPECULATIONS = 256
+
+_lock = threading.Lock()
+_speculations = OrderedDict()
+_stats = {"speculated": 0, "saved": 0, "wasted": 0, "saved_seconds": 0.0, "wasted_seconds": 0.0}
+
+
+def side_effect_free(func):
+    """标记工具无副作用, 允许在用户确认前推测执行"""
+    func.side_effect_free = True
+    return func
+
+
+def _elapsed(entry):
+    start, end = entry["start"], entry["end"]
+    return (end or time.monotonic()) - start
+
+
+def _finished(entry, future):
+    entry["end"] = time.monotonic()
+
+
+def _key(tool_call):
+    ctx = get_script_run_ctx()
+    return (ctx.session_id if ctx else None, tool_call["id"])
+
+
+def _drop(key):
+    entry = _speculations.pop(key, None)
+    if entry is not None:
+        entry["future"].cancel()
+        _stats["wasted"] += 1
+        _stats["wasted_seconds"] += _elapsed(entry)
+
+
+def speculate(tool_calls, hooks):
+    """对无副作用的工具提前提交执行"""
+    for tool_call in tool_calls:
+        hook = hooks.get(tool_call["function"]["name"])
+        if not getattr(hook, "side_effect_free", False):
+            continue
+        function_args, future = submit_tool_call(tool_call, hooks)
+        if future is None:
+            continue
+        entry = {"args": function_args, "future": future, "start": time.monotonic(), "end": None}
+        future.add_done_callback(lambda f, entry=entry: _finished(entry, f))
+        key = _key(tool_call)
+        with _lock:
+            _drop(key)
+            _speculations[key] = entry
+            _stats["speculated"] += 1
+            while len(_speculations) > MAX_SPECULATIONS:
+                _drop(next(iter(_speculations)))
+
+
+def claim(tool_calls):
+    """用户确认后取出推测结果, 返回 {tool_call_id: (function_args, future)}, 可直接传给 execute_tool_calls"""
+    claimed = {}
+    with _lock:
+        for tool_call in tool_calls:
+            entry = _speculations.pop(_key(tool_call), None)
+            if entry is None:
+                continue
+            _stats["saved"] += 1
+            _stats["saved_seconds"] += _elapsed(entry)
+            claimed[tool_call["id"]] = (entry["args"], entry["future"])
+    return claimed
+
+
+def discard(tool_calls):
+    """用户拒绝后丢弃推测结果"""
+    with _lock:
+        for tool_call in tool_calls:
+            _drop(_key(tool_call))
+
+
+def speculation_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["pending"] = len(_speculations)
+    return stats
@@ -0,0 +1,132 @@
+import json
+import re
+import time
+
+# 流式 tool_call 组装
+# 参数片段先存到列表里, 同时增量扫描 JSON 括号深度, 顶层对象闭合且能解析时立即回调,
+# 后面的 tool_call 还在流式返回时前面的工具就可以开始执行; 整体只做一次 join, 线性复杂度
+
+_SPECIAL = re.compile(r'[{}\[\]"\\]')
+
+
+class _PendingToolCall:
+    def __init__(self):
+        self.id_parts = []
+        self.name_parts = []
+        self.argument_parts = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.emitted = False
+        self._tool_call = None
+
+    def scan(self, text):
+        # 上一个片段以反斜杠结尾时, 本片段第一个字符是被转义的
+        skip = 0 if self.escape else -1
+        self.escape = False
+        closed = False
+        for m in _SPECIAL.finditer(text):
+            pos, c = m.start(), m.group()
+            if pos == skip:
+                continue
+            if self.in_string:
+                if c == "\\":
+                    if pos + 1 < len(text):
+                        skip = pos + 1
+                    else:
+                        self.escape = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c in "{[":
+                self.depth += 1
+                self.started = True
+            elif c in "}]":
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    closed = True
+        return closed
+
+    def build(self):
+        if self._tool_call is None:
+            self._tool_call = {
+                "id": "".join(self.id_parts),
+                "type": "function",
+                "function": {
+                    "name": "".join(self.name_parts),
+                    "arguments": "".join(self.argument_parts),
+                },
+            }
+        return self._tool_call
+
+
+class ToolCalls(list):
+    """finish() 的返回值, 额外带上第一个 delta 到达的时刻 (time.perf_counter) 和从它到组装完成的耗时"""
+    first_delta_at = None
+    assembly_seconds = 0.0
+
+
+class ToolCallAssembler:
+    """
+    assembler = ToolCallAssembler(on_tool_call=dispatch)
+    for chunk in response:
+        if delta.tool_calls:
+            assembler.feed(delta.tool_calls)
+    tool_calls = assembler.finish()
+    """
+
+    def __init__(self, on_tool_call=None):
+        self.on_tool_call = on_tool_call
+        self._pending = []
+        self._first_delta_at = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def feed(self, tcchunklist):
+        """处理一个 delta.tool_calls, 返回本次新完成的 tool_call 列表"""
+        if self._first_delta_at is None:
+            self._first_delta_at = time.perf_counter()
+        completed = []
+        for tcchunk in tcchunklist:
+            while len(self._pending) <= tcchunk.index:
+                self._pending.append(_PendingToolCall())
+            tc = self._pending[tcchunk.index]
+            if tcchunk.id:
+                tc.id_parts.append(tcchunk.id)
+            if tcchunk.function is None:
+                continue
+            if tcchunk.function.name:
+                tc.name_parts.append(tcchunk.function.name)
+            if tcchunk.function.arguments:
+                tc.argument_parts.append(tcchunk.function.arguments)
+                if tc.scan(tcchunk.function.arguments) and self._try_emit(tc):
+                    completed.append(tc.build())
+        return completed
+
+    def _try_emit(self, tc):
+        if tc.emitted:
+            return False
+        try:
+            json.loads("".join(tc.argument_parts))
+        except json.JSONDecodeError:
+            return False
+        tc.emitted = True
+        if self.on_tool_call:
+            self.on_tool_call(tc.build())
+        return True
+
+    def finish(self):
+        """流结束, 剩余未回调的 tool_call (如无参数或参数不完整) 也交给回调, 返回全部 tool_call"""
+        for tc in self._pending:
+            if not tc.emitted:
+                tc.emitted = True
+                if self.on_tool_call:
+                    self.on_tool_call(tc.build())
+        tool_calls = ToolCalls(tc.build() for tc in self._pending)
+        if self._first_delta_at is not None:
+            tool_calls.first_delta_at = self._first_delta_at
+            tool_calls.assembly_seconds = time.perf_counter() - self._first_delta_at
+        return tool_calls
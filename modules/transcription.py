@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 语音转写服务
+# 结果按音频 sha256 缓存在磁盘上, 所有会话共享且重启后仍有效; 转写在后台线程中执行, 同一段音频只提交一次
+
+CACHE_DIR = os.getenv("STREAMLIT_DEMO_TRANSCRIPT_CACHE", ".cache/transcripts")
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="transcribe")
+_lock = threading.Lock()
+_inflight = {}
+
+
+def audio_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _cache_path(key, model):
+    return os.path.join(CACHE_DIR, f"{key}.{model}.txt")
+
+
+def cached_transcript(key, model="whisper-1"):
+    try:
+        with open(_cache_path(key, model), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _transcribe(client, data, key, model):
+    transcript = client.audio.transcriptions.create(model=model, file=("audio.wav", data))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(key, model)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(transcript.text)
+    os.replace(tmp, path)
+    return transcript.text
+
+
+def submit_transcription(client, data, model="whisper-1"):
+    """提交转写任务, 返回 key; 已缓存或正在转写的音频不会重复提交"""
+    key = audio_key(data)
+    with _lock:
+        if key in _inflight or cached_transcript(key, model) is not None:
+            return key
+        future = _executor.submit(_transcribe, client, data, key, model)
+        _inflight[key] = future
+    future.add_done_callback(lambda _: _forget(key))
+    return key
+
+
+def _forget(key):
+    # 成功的结果已经写入磁盘; 失败的保留一次以便把错误返回给页面
+    with _lock:
+        future = _inflight.get(key)
+        if future is not None and future.exception() is None:
+            del _inflight[key]
+
+
+def transcription_result(key, model="whisper-1"):
+    """返回 (状态, 文本或错误信息), 状态为 done / pending / error"""
+    text = cached_transcript(key, model)
+    if text is not None:
+        return "done", text
+    with _lock:
+        future = _inflight.get(key)
+    if future is None:
+        return "error", "transcription not found"
+    if not future.done():
+        return "pending", None
+    with _lock:
+        _inflight.pop(key, None)
+    if future.exception() is not None:
+        return "error", str(future.exception())
+    return "done", future.result()
@@ -0,0 +1,241 @@
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+# 语音合成 (TTS) 缓存与本地媒体服务
+# 合成结果按 (text, voice, model) 缓存到磁盘; 合成过程中边接收边写入 .partial 文件,
+# 本地媒体服务把正在合成的音频以 chunked 方式推给浏览器, 不必等合成结束就能开始播放;
+# 已完成的文件支持 HTTP Range 请求, 可以拖动进度条;
+# 媒体服务没有鉴权, 默认只监听本机; 远程访问需要配置 STREAMLIT_DEMO_MEDIA_URL, 否则等合成结束后直接用 st.audio 播放
+
+CACHE_DIR = os.getenv("STREAMLIT_DEMO_TTS_CACHE", ".cache/tts")
+MEDIA_HOST = os.getenv("STREAMLIT_DEMO_MEDIA_HOST", "127.0.0.1")
+MEDIA_PORT = int(os.getenv("STREAMLIT_DEMO_MEDIA_PORT", "8502"))
+# 浏览器访问媒体服务的地址; 未配置时只有从本机访问页面才使用媒体服务
+MEDIA_URL = os.getenv("STREAMLIT_DEMO_MEDIA_URL")
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "[::1]"}
+CHUNK_SIZE = 16 * 1024
+
+_lock = threading.Lock()
+_inflight = {}
+
+
+class _Synthesis:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.size = 0
+        self.done = False
+        self.error = None
+
+
+def tts_key(text, voice, model):
+    return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, f"{key}.mp3")
+
+
+def cached_audio_path(key):
+    path = _path(key)
+    return path if os.path.exists(path) else None
+
+
+def _synthesize(client, text, voice, model, key, synthesis):
+    partial = _path(key) + ".partial"
+    try:
+        with client.audio.speech.with_streaming_response.create(
+            model=model, voice=voice, input=text, response_format="mp3"
+        ) as response, open(partial, "wb") as f:
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                f.write(chunk)
+                f.flush()
+                with synthesis.cond:
+                    synthesis.size += len(chunk)
+                    synthesis.cond.notify_all()
+        os.replace(partial, _path(key))
+    except Exception as e:
+        synthesis.error = e
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+    finally:
+        with synthesis.cond:
+            synthesis.done = True
+            synthesis.cond.notify_all()
+        if synthesis.error is None:
+            # 失败的合成留在登记表里, 由 wait_audio 报告错误或被下一次 start_synthesis 替换
+            with _lock:
+                _inflight.pop(key, None)
+
+
+def start_synthesis(client, text, voice, model):
+    """开始后台合成 (已缓存或正在合成时不重复), 返回 key"""
+    key = tts_key(text, voice, model)
+    with _lock:
+        if (key in _inflight and _inflight[key].error is None) or cached_audio_path(key):
+            return key
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # 先创建空的 .partial, 合成线程还没开始写时媒体服务也能打开它
+        open(_path(key) + ".partial", "wb").close()
+        synthesis = _inflight[key] = _Synthesis()
+    threading.Thread(
+        target=_synthesize, args=(client, text, voice, model, key, synthesis), name="tts", daemon=True
+    ).start()
+    return key
+
+
+def wait_audio(key, timeout=None):
+    """等待合成结束, 返回音频文件路径; 合成失败时抛出原异常"""
+    with _lock:
+        synthesis = _inflight.get(key)
+    if synthesis is not None:
+        with synthesis.cond:
+            synthesis.cond.wait_for(lambda: synthesis.done, timeout)
+        if not synthesis.done:
+            raise TimeoutError(f"TTS {key} 未在 {timeout} 秒内完成")
+        if synthesis.error is not None:
+            with _lock:
+                if _inflight.get(key) is synthesis:
+                    del _inflight[key]
+            raise synthesis.error
+    path = cached_audio_path(key)
+    if path is None:
+        raise FileNotFoundError(f"TTS {key} 没有缓存, 也没有正在进行的合成")
+    return path
+
+
+def _media_url():
+    if MEDIA_URL:
+        return MEDIA_URL.rstrip("/")
+    host = st.context.headers.get("Host") or ""
+    if host.rsplit(":", 1)[0] in LOCAL_HOSTS:
+        return f"http://{host.rsplit(':', 1)[0]}:{MEDIA_PORT}"
+    return None
+
+
+def audio_url(key):
+    """浏览器边合成边播放的地址; 媒体服务不可用或浏览器访问不到时返回 None"""
+    url = _media_url()
+    if url is None or start_media_server() is None:
+        return None
+    return f"{url}/tts/{key}.mp3"
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        match = re.fullmatch(r"/tts/([0-9a-f]{64})\.mp3", self.path)
+        if not match:
+            self.send_error(404)
+            return
+        key = match.group(1)
+        try:
+            path = cached_audio_path(key)
+            if path:
+                self._send_file(path)
+                return
+            with _lock:
+                synthesis = _inflight.get(key)
+            if synthesis is None:
+                # 两次检查之间合成刚好结束
+                path = cached_audio_path(key)
+                if path:
+                    self._send_file(path)
+                else:
+                    self.send_error(404)
+                return
+            self._send_partial(key, synthesis)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_file(self, path):
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Cache-Control", "public, max-age=86400")
+        self.end_headers()
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                self.wfile.write(data)
+                remaining -= len(data)
+
+    def _send_partial(self, key, synthesis):
+        try:
+            f = open(_path(key) + ".partial", "rb")
+        except FileNotFoundError:
+            # 合成已经结束 (成功时已重命名, 失败时已删除)
+            path = cached_audio_path(key)
+            if path:
+                self._send_file(path)
+            else:
+                self.send_error(404)
+            return
+        # 合成中的音频长度未知, 用 chunked 编码边读边发
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent = 0
+        with f:
+            while True:
+                with synthesis.cond:
+                    while synthesis.size <= sent and not synthesis.done:
+                        synthesis.cond.wait()
+                    available, done = synthesis.size, synthesis.done
+                # 合成结束后 .partial 会被重命名, 已打开的文件句柄仍然可读
+                data = f.read(available - sent)
+                if data:
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    sent += len(data)
+                if done and (sent >= available or not data):
+                    break
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+@st.cache_resource(show_spinner=False)
+def start_media_server():
+    """每个进程只启动一次本地媒体服务, 端口被占用等无法启动时返回 None"""
+    try:
+        server = ThreadingHTTPServer((MEDIA_HOST, MEDIA_PORT), _MediaHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="media-server", daemon=True).start()
+    return server
@@ -0,0 +1,67 @@
+import importlib
+import threading
+import time
+
+import streamlit as st
+
+# 进程启动后的后台预热: 预先填充 st.cache_data 缓存, 导入重型模块, 首个访问者不再承担冷启动开销
+# 预热函数用 @warmup 声明, start_warmup() 每个进程只会启动一次后台线程
+
+# 声明了预热函数的模块, 启动预热前先导入以完成注册
+HOOK_MODULES = ["modules.model_prices", "modules.chart_data"]
+HEAVY_IMPORTS = ["pandas", "numpy", "altair", "matplotlib.pyplot", "plotly.graph_objects", "plotly.express"]
+
+_hooks = []
+_results = {}
+_ready = threading.Event()
+
+
+def warmup(name=None):
+    """
+    @warmup()
+    @st.cache_data
+    def load_model_data(): ...
+    """
+    def decorator(func):
+        _hooks.append((name or func.__name__, func))
+        return func
+
+    return decorator
+
+
+def _import_heavy_modules():
+    for module in HEAVY_IMPORTS:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def _run():
+    hooks = [("import heavy modules", _import_heavy_modules)]
+    for module in HOOK_MODULES:
+        importlib.import_module(module)
+    hooks.extend(_hooks)
+    for name, func in hooks:
+        start = time.perf_counter()
+        try:
+            func()
+            _results[name] = {"seconds": round(time.perf_counter() - start, 3), "error": None}
+        except Exception as e:
+            _results[name] = {"seconds": round(time.perf_counter() - start, 3), "error": f"{type(e).__name__}: {e}"}
+    _ready.set()
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_ready(timeout=None):
+    return _ready.wait(timeout)
+
+
+def warmup_status():
+    return {"ready": _ready.is_set(), "hooks": dict(_results)}
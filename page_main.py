@@ -1,21 +1,21 @@
 import streamlit as st
-import os
+from modules.page_registry import navigation_config
+from modules.rerun_profiler import ENABLED as PROFILE_ENABLED, run_page
+from modules.warmup import start_warmup
+from modules.session_memory import enforce_memory
 
-section = ["Chat", "Chart", "Other"]
+# 首次运行时在后台预热缓存和重型模块
+start_warmup()
 
-config = {i: [] for i in section}
-
-for f in os.listdir("pages"):
-    if not f.endswith(".py"):
-        continue
-    for k in section[:-1]:
-        if f.startswith(k.lower()):
-            config[k].append(st.Page(f"pages/{f}"))
-            break
-    else:
-        config["Other"].append(st.Page(f"pages/{f}"))
+config = navigation_config()
+if PROFILE_ENABLED:
+    # 开发用页面, 只在开启性能分析时显示
+    config["Dev"] = [st.Page("dev/profiler.py")]
 
 pg = st.navigation(config)
 
-pg.run()
+# 运行页面前按上限裁剪本会话的 session_state; 聊天页面自己也会调用 (main.py 多页面模式下没有统一入口), 间隔内重复调用直接返回上次结果
+enforce_memory()
+
+run_page(pg)
 
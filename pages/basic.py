@@ -1,4 +1,4 @@
-from modules import *
+from modules import st, time, dataframe
 
 tab_text, tab_data, tab_media, tab_widgets, tab_notify, tab_status = st.tabs(["Text", "Data", "Media", "Widgets", "Notifications", "Status"])
 
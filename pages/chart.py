@@ -28,13 +28,7 @@ with tab_2:
         st.altair_chart(c, use_container_width=True)
 
 from vega_datasets import data
-
-# We use @st.cache_data to keep the dataset in cache
-@st.cache_data
-def get_data():
-    source = data.stocks()
-    source = source[source.date.gt("2004-01-01")]
-    return source
+from modules.chart_data import get_stocks
 
 # Define the base time-series chart.
 def get_chart(data):
@@ -77,7 +71,7 @@ def get_chart(data):
 
 
 with tab_3:
-    source = get_data()
+    source = get_stocks()
     chart = get_chart(source)
     st.altair_chart(chart, use_container_width=True)
 
@@ -1,4 +1,4 @@
-from modules import *
+import streamlit as st
 
 from pyecharts import options as opts
 from pyecharts.charts import Pie, Line, Bar, Timeline, Map
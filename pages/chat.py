@@ -1,5 +1,11 @@
 import streamlit as st
+from modules.stream_metrics import timed, metrics_panel
+from modules.chat_render import render_history
+from modules.session_memory import enforce_memory
 
+enforce_memory()
+
+@timed("chat")
 def chat_stream():
     response = "This is mock response for test."
     for word in response.split():
@@ -13,12 +19,12 @@ st.caption("🚀 A streamlit chatbot powered by OpenAI LLM")
 with st.sidebar:
     show_history = st.checkbox('Show history', False)
     reset_history = st.button("reset history")
+metrics_panel()
 
 if "chat_history" not in st.session_state or reset_history:
     st.session_state["chat_history"] = [{"role": "assistant", "content": "How can I help you?"}]
 
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(st.session_state.chat_history)
 
 if prompt := st.chat_input():
     st.session_state.chat_history.append({"role": "user", "content": prompt})
@@ -1,4 +1,5 @@
 import streamlit as st
+from modules.stream_render import CoalescingWriter
 
 def chat_stream():
     response = "This is mock response for test."
@@ -10,10 +11,9 @@ def chat_stream():
 
 stream = chat_stream()
 with st.chat_message("assistant"):
-    response = ""
-    contain = st.empty()
+    writer = CoalescingWriter(st.empty())
     for i in stream:
-        response += i
-        contain.write(f"{response}")
+        writer.append(i)
+    response = writer.flush()
 
 st.write(response)
\ No newline at end of file
@@ -1,22 +1,28 @@
 import streamlit as st
-from openai import OpenAI
+from modules.llm_client import get_client
+from modules.context_budget import fit_messages
+from modules.stream_metrics import timed, metrics_panel
+from modules.session_memory import enforce_memory
+from modules.image_store import thumbnail_path, to_api_messages
+from modules.image_preprocess import preprocess_images
+from modules.transcription import audio_key, submit_transcription, transcription_result
+from modules.tts import audio_url, cached_audio_path, start_synthesis, tts_key, wait_audio
 import dotenv
 import os
-from PIL import Image
 from audio_recorder_streamlit import audio_recorder
-import base64
-from io import BytesIO
 
 dotenv.load_dotenv()
 
 
 # Function to query and stream the response from the LLM
+@timed("chat_with_images")
 def stream_llm_response(client, model_params):
     response_message = ""
 
+    model = model_params["model"] if "model" in model_params else "gpt-4o"
     for chunk in client.chat.completions.create(
-        model=model_params["model"] if "model" in model_params else "gpt-4o",
-        messages=st.session_state.messages,
+        model=model,
+        messages=to_api_messages(fit_messages(st.session_state.messages, model, reserve=4096)),
         temperature=model_params["temperature"] if "temperature" in model_params else 0.3,
         max_tokens=4096,
         stream=True,
@@ -34,14 +40,25 @@ def stream_llm_response(client, model_params):
         ]})
 
 
-# Function to convert file to base64
-def get_image_base64(image_raw):
-    buffered = BytesIO()
-    image_raw.save(buffered, format=image_raw.format)
-    img_byte = buffered.getvalue()
+def take_transcript():
+    """取出已完成的转写结果, 失败时显示错误并返回 None"""
+    status, text = transcription_result(st.session_state.pending_transcript)
+    st.session_state.pending_transcript = None
+    if status == "error":
+        st.error(f"语音转写失败: {text}")
+        return None
+    return text
 
-    return base64.b64encode(img_byte).decode('utf-8')
 
+@st.fragment(run_every=1)
+def transcription_progress():
+    # 转写进行中只刷新这个片段, 完成后整页重新运行以发送转写出的问题
+    status, _ = transcription_result(st.session_state.pending_transcript)
+    if status == "pending":
+        st.caption("🎙️ 正在转写语音...")
+        return
+    st.session_state.audio_prompt = take_transcript()
+    st.rerun()
 
 
 def main():
@@ -54,6 +71,9 @@ def main():
         initial_sidebar_state="expanded",
     )
 
+    # 图片消息占用内存较多, 每次运行前按上限裁剪
+    enforce_memory()
+
     # --- Header ---
     st.html("""<h1 style="text-align: center; color: #6ca395;">🤖 <i>OmniChat</i> 💬</h1>""")
 
@@ -74,7 +94,7 @@ def main():
         st.warning("⬅️ Please introduce your OpenAI API Key (make sure to have funds) to continue...")
 
     else:
-        client = OpenAI(api_key=openai_api_key)
+        client = get_client(api_key=openai_api_key)
 
         if "messages" not in st.session_state:
             st.session_state.messages = []
@@ -85,8 +105,8 @@ def main():
                 for content in message["content"]:
                     if content["type"] == "text":
                         st.write(content["text"])
-                    elif content["type"] == "image_url":      
-                        st.image(content["image_url"]["url"])
+                    elif content["type"] == "image_ref":
+                        st.image(thumbnail_path(content["image_ref"]))
 
         # Side bar model options and inputs
         with st.sidebar:
@@ -123,6 +143,8 @@ def main():
             with st.popover("View messages"):
                 st.write(st.session_state.messages)
 
+            metrics_panel()
+
             st.divider()
 
             # Image Upload
@@ -130,31 +152,41 @@ def main():
                     
                 st.write("### **🖼️ Add an image:**")
 
-                def add_image_to_messages():
-                    if st.session_state.uploaded_img or st.session_state.camera_img:
-                        img_type = st.session_state.uploaded_img.type if st.session_state.uploaded_img else "image/jpeg"
-                        raw_img = Image.open(st.session_state.uploaded_img or st.session_state.camera_img)
-                        img = get_image_base64(raw_img)
-                        st.session_state.messages.append(
-                            {
-                                "role": "user", 
-                                "content": [{
-                                    "type": "image_url",
-                                    "image_url": {"url": f"data:{img_type};base64,{img}"}
-                                }]
-                            }
-                        )
+                def add_image_to_messages(key):
+                    img_files = st.session_state.get(key)
+                    if not img_files:
+                        return
+                    if not isinstance(img_files, list):
+                        img_files = [img_files]
+                    # 多选上传时每次变化都会带上之前选过的文件, 只添加还没加过的
+                    added = st.session_state.setdefault("added_image_ids", set())
+                    img_files = [img_file for img_file in img_files if img_file.file_id not in added]
+                    if not img_files:
+                        return
+                    added.update(img_file.file_id for img_file in img_files)
+                    # 缩放/去元数据/重新编码后存一份, 消息里保存内容哈希引用; 多张图片并行处理
+                    image_refs = preprocess_images([img_file.getvalue() for img_file in img_files])
+                    st.session_state.messages.append(
+                        {
+                            "role": "user", 
+                            "content": [
+                                {"type": "image_ref", "image_ref": image_ref}
+                                for image_ref in image_refs
+                            ]
+                        }
+                    )
 
                 cols_img = st.columns(2)
 
                 with cols_img[0]:
                     with st.popover("📁 Upload"):
                         st.file_uploader(
-                            "Upload an image", 
+                            "Upload images", 
                             type=["png", "jpg", "jpeg"], 
-                            accept_multiple_files=False,
+                            accept_multiple_files=True,
                             key="uploaded_img",
                             on_change=add_image_to_messages,
+                            args=("uploaded_img",),
                         )
 
                 with cols_img[1]:                    
@@ -165,6 +197,7 @@ def main():
                                 "Take a picture", 
                                 key="camera_img",
                                 on_change=add_image_to_messages,
+                                args=("camera_img",),
                             )
 
             # Audio Upload
@@ -176,14 +209,19 @@ def main():
                 st.session_state.prev_speech_hash = None
 
             speech_input = audio_recorder("Press to talk:", icon_size="3x", neutral_color="#6ca395", )
-            if speech_input and st.session_state.prev_speech_hash != hash(speech_input):
-                st.session_state.prev_speech_hash = hash(speech_input)
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1", 
-                    file=("audio.wav", speech_input),
-                )
-
-                audio_prompt = transcript.text
+            if speech_input and st.session_state.prev_speech_hash != audio_key(speech_input):
+                # 后台转写, 相同音频直接命中磁盘缓存
+                st.session_state.prev_speech_hash = submit_transcription(client, speech_input)
+                st.session_state.pending_transcript = st.session_state.prev_speech_hash
+
+            if st.session_state.get("pending_transcript"):
+                status, _ = transcription_result(st.session_state.pending_transcript)
+                if status == "pending":
+                    transcription_progress()
+                else:
+                    audio_prompt = take_transcript()
+            elif "audio_prompt" in st.session_state:
+                audio_prompt = st.session_state.pop("audio_prompt")
 
         # Chat input
         if prompt := st.chat_input("Hi! Ask me anything...") or audio_prompt:
@@ -208,18 +246,24 @@ def main():
 
             # --- Added Audio Response (optional) ---
             if audio_response:
-                response =  client.audio.speech.create(
-                    model=tts_model,
-                    voice=tts_voice,
-                    input=st.session_state.messages[-1]["content"][0]["text"],
-                )
-                audio_base64 = base64.b64encode(response.content).decode('utf-8')
-                audio_html = f"""
-                <audio controls autoplay>
-                    <source src="data:audio/wav;base64,{audio_base64}" type="audio/mp3">
-                </audio>
-                """
-                st.html(audio_html)
+                text = st.session_state.messages[-1]["content"][0]["text"]
+                path = cached_audio_path(tts_key(text, tts_voice, tts_model))
+                if path:
+                    st.audio(path, format="audio/mp3", autoplay=True)
+                else:
+                    key = start_synthesis(client, text, tts_voice, tts_model)
+                    url = audio_url(key)
+                    if url:
+                        # 边合成边播放, 音频由本地媒体服务提供
+                        st.html(f'<audio controls autoplay preload="auto" src="{url}"></audio>')
+                    else:
+                        # 浏览器访问不到媒体服务时等合成结束再播放
+                        try:
+                            with st.spinner("正在合成语音..."):
+                                path = wait_audio(key, timeout=120)
+                            st.audio(path, format="audio/mp3", autoplay=True)
+                        except Exception as e:
+                            st.error(f"语音合成失败: {e}")
 
 
 
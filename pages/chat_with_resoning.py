@@ -1,11 +1,18 @@
 import streamlit as st
+from modules.stream_metrics import timed, metrics_panel
+from modules.chat_render import render_history
+from modules.stream_render import write_reasoning_stream
+from modules.session_memory import enforce_memory
 import time
 
+enforce_memory()
+
+@timed("chat_with_resoning")
 def chat_stream():
     response = "This is mock response for test."
     think_response = "I am thinking..."
     for word in think_response.split():
-        yield {"resonning_content": word + " "}
+        yield {"reasoning_content": word + " "}
         time.sleep(0.3)
     for word in response.split():
         yield word + " "
@@ -17,25 +24,30 @@ st.caption("🚀 A streamlit chatbot powered by OpenAI LLM")
 with st.sidebar:
     show_history = st.checkbox('Show history', False)
     reset_history = st.button("reset history")
+metrics_panel()
 
 if "chat_history" not in st.session_state or reset_history:
     st.session_state["chat_history"] = [{"role": "assistant", "content": "How can I help you?"}]
+# 思考过程按消息下标单独保存为 (回答内容, 思考过程), chat_history 与其他页面共享并会原样发送给接口, 不能带额外字段;
+# 其他页面重置或修改 chat_history 后下标对应的回答不再一致, 这些思考过程直接丢弃
+if "chat_reasoning" not in st.session_state or reset_history:
+    st.session_state["chat_reasoning"] = {}
+history = st.session_state.chat_history
+st.session_state["chat_reasoning"] = {
+    index: (content, reasoning)
+    for index, (content, reasoning) in st.session_state.chat_reasoning.items()
+    if index < len(history) and history[index].get("content") == content
+}
 
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(history, reasoning={index: reasoning for index, (_, reasoning) in st.session_state.chat_reasoning.items()})
 
 if prompt := st.chat_input():
     st.session_state.chat_history.append({"role": "user", "content": prompt})
     st.chat_message("user").write(prompt)
     with st.chat_message("assistant"):
-        reasoning_content = ""
         stream = chat_stream()
-        
-        if isinstance(stream, dict):
-            if 'reasoning_content' in stream:
-                st.write(stream['reasoning_content'])
-        else:
-            response = st.write_stream(stream)
+        reasoning_content, response = write_reasoning_stream(stream)
+    st.session_state.chat_reasoning[len(st.session_state.chat_history)] = (response, reasoning_content)
     st.session_state.chat_history.append({"role": "assistant", "content": response})
     
 if show_history:
@@ -1,13 +1,23 @@
 import streamlit as st
-from openai import OpenAI
+from modules.chat_render import render_history
+from modules.tool_cache import cacheable, tool_cache
+from modules.tool_stream import ToolCallAssembler
+from modules.context_budget import fit_messages, budget_stats
+from modules.stream_render import CoalescingWriter
+from modules.stream_metrics import timed, metrics_panel
+from modules.llm_client import get_client, pool_stats
+from modules.tool_executor import execute_tool_calls, submit_tool_call
+from modules.session_memory import enforce_memory
 import json
-import itertools
 
+enforce_memory()
 
-client = OpenAI()
+
+client = get_client()
 
 # Example dummy function hard coded to return the same weather
 # In production, this could be your backend API or an external API
+@cacheable(ttl=600)
 def get_current_weather(location, unit="fahrenheit"):
     """Get the current weather in a given location"""
     if "tokyo" in location.lower():
@@ -43,34 +53,25 @@ TOOL_HOOKS = {
     "get_current_weather": get_current_weather,
 }
 
-def chat_stream(messages, model="gpt-4o-mini", tools=[], **kargs):
+@timed("chat_with_tools")
+def chat_stream(messages, model="gpt-4o-mini", tools=[], on_tool_call=None, **kargs):
     response = client.chat.completions.create(
         model=model,
-        messages=messages,
+        messages=fit_messages(messages, model),
         tools=tools if tools else None,
         stream=True,
         **kargs
     )
-    tool_calls = []
+    assembler = ToolCallAssembler(on_tool_call)
     for chunk in response:
         if chunk and chunk.choices:
             delta = chunk.choices[0].delta
             if delta.tool_calls:
-                tcchunklist = delta.tool_calls
-                for tcchunk in tcchunklist:
-                    if len(tool_calls) <= tcchunk.index:
-                        tool_calls.append({"id": "", "type": "function", "function": { "name": "", "arguments": "" } })
-                    tc = tool_calls[tcchunk.index]
-                    if tcchunk.id:
-                        tc["id"] += tcchunk.id
-                    if tcchunk.function.name:
-                        tc["function"]["name"] += tcchunk.function.name
-                    if tcchunk.function.arguments:
-                        tc["function"]["arguments"] += tcchunk.function.arguments
+                assembler.feed(delta.tool_calls)
             elif delta.content:
                 yield delta.content
-    if tool_calls:
-        yield tool_calls
+    if assembler:
+        yield assembler.finish()
 
 
 st.title("💬 Chatbot")
@@ -79,50 +80,51 @@ st.caption("🚀 A streamlit chatbot powered by OpenAI LLM")
 with st.sidebar:
     show_history = st.checkbox('Show history', False)
     reset_history = st.button("reset history")
+    with st.expander("Client pool stats"):
+        st.json(pool_stats())
+    with st.expander("Tool cache stats"):
+        st.json(tool_cache.stats())
+    with st.expander("Context budget stats"):
+        st.json(budget_stats())
+metrics_panel()
 
 if "chat_history" not in st.session_state or reset_history:
     st.session_state["chat_history"] = [{"role": "assistant", "content": "How can I help you?"}]
 
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(st.session_state.chat_history)
 
 if prompt := st.chat_input():
     st.session_state.chat_history.append({"role": "user", "content": prompt})
     st.chat_message("user").write(prompt)
     response_messages = ''
-    response = chat_stream(st.session_state.chat_history, tools=tools)
+    # 参数一完整就提前提交执行, 不必等整个流结束
+    submitted = {}
+    def dispatch(tool_call):
+        submitted[tool_call["id"]] = submit_tool_call(tool_call, TOOL_HOOKS)
+    response = chat_stream(st.session_state.chat_history, tools=tools, on_tool_call=dispatch)
     tool_calls = []
     while True:
         with st.chat_message("assistant"):
-            assistant_output = st.empty()
+            assistant_output = CoalescingWriter(st.empty(), initial=response_messages)
             for i in response:
                 if isinstance(i, str):
-                    response_messages += i
-                    assistant_output.write(response_messages)
+                    assistant_output.append(i)
                 elif isinstance(i, list):
                     tool_calls = i
                     break
+            response_messages = assistant_output.flush()
         if not tool_calls:
             break
         st.session_state.chat_history.append({"role": "assistant", "content": "", "tool_calls": tool_calls})
-        for tool_call in tool_calls:
-            function_name = tool_call["function"]["name"]
-            function_args = json.loads(tool_call["function"]["arguments"])
-            function_response = TOOL_HOOKS[function_name](**function_args)
+        for function_args, tool_message in execute_tool_calls(tool_calls, TOOL_HOOKS, submitted=submitted):
             with st.chat_message("tool", avatar='🛠️'):
-                with st.status(f"调用插件: {function_name} 使用参数: {function_args}"):
-                    st.write(function_response)
-            st.session_state.chat_history.append(
-                {
-                    "tool_call_id": tool_call["id"],
-                    "role": "tool",
-                    "name": function_name,
-                    "content": function_response,
-                }
-            )
+                with st.status(f"调用插件: {tool_message['name']} 使用参数: {function_args}"):
+                    st.write(tool_message["content"])
+            st.session_state.chat_history.append(tool_message)
         # 重置tool_calls并获取新的响应
         tool_calls = []
-        response = chat_stream(st.session_state.chat_history, tools=tools)
+        submitted.clear()
+        response = chat_stream(st.session_state.chat_history, tools=tools, on_tool_call=dispatch)
     # 最后一次响应的处理
     if response_messages:
         st.session_state.chat_history.append({"role": "assistant", "content": response_messages})
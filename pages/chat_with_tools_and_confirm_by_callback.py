@@ -1,13 +1,25 @@
 import streamlit as st
-from openai import OpenAI
+from modules.chat_render import render_history
+from modules.tool_cache import cacheable
+from modules.tool_stream import ToolCallAssembler
+from modules.context_budget import fit_messages
+from modules.stream_metrics import timed
+from modules.llm_client import get_client
+from modules.tool_speculation import side_effect_free, speculate, claim, discard
+from modules.tool_executor import execute_tool_calls
+from modules.session_memory import enforce_memory
 import json
 import itertools
 
+enforce_memory()
 
-client = OpenAI()
+
+client = get_client()
 
 # Example dummy function hard coded to return the same weather
 # In production, this could be your backend API or an external API
+@side_effect_free
+@cacheable(ttl=600)
 def get_current_weather(location, unit="fahrenheit"):
     """Get the current weather in a given location"""
     if "tokyo" in location.lower():
@@ -43,34 +55,25 @@ TOOL_HOOKS = {
     "get_current_weather": get_current_weather,
 }
 
-def chat_stream(messages, model="gpt-3.5-turbo", tools=[], **kargs):
+@timed("chat_with_tools_and_confirm_by_callback")
+def chat_stream(messages, model="gpt-3.5-turbo", tools=[], on_tool_call=None, **kargs):
     response = client.chat.completions.create(
         model=model,
-        messages=messages,
+        messages=fit_messages(messages, model),
         tools=tools if tools else None,
         stream=True,
         **kargs
     )
-    tool_calls = []
+    assembler = ToolCallAssembler(on_tool_call)
     for chunk in response:
         if chunk and chunk.choices:
             delta = chunk.choices[0].delta
             if delta.tool_calls:
-                tcchunklist = delta.tool_calls
-                for tcchunk in tcchunklist:
-                    if len(tool_calls) <= tcchunk.index:
-                        tool_calls.append({"id": "", "type": "function", "function": { "name": "", "arguments": "" } })
-                    tc = tool_calls[tcchunk.index]
-                    if tcchunk.id:
-                        tc["id"] += tcchunk.id
-                    if tcchunk.function.name:
-                        tc["function"]["name"] += tcchunk.function.name
-                    if tcchunk.function.arguments:
-                        tc["function"]["arguments"] += tcchunk.function.arguments
+                assembler.feed(delta.tool_calls)
             elif delta.content:
                 yield delta.content
-    if tool_calls:
-        yield tool_calls
+    if assembler:
+        yield assembler.finish()
 
 # 回调函数：确认工具调用
 def confirm_tool_call():
@@ -79,27 +82,18 @@ def confirm_tool_call():
     # 将工具调用添加到聊天历史
     st.session_state.chat_history.append({"role": "assistant", "content": "", "tool_calls": tool_calls})
     
-    # 执行每个工具调用并存储结果
-    for tool_call in tool_calls:
-        function_name = tool_call["function"]["name"]
-        function_args = json.loads(tool_call["function"]["arguments"])
-        function_response = TOOL_HOOKS[function_name](**function_args)
-        
+    # 并发执行所有工具调用, 结果按 tool_call 顺序返回
+    for function_args, tool_message in execute_tool_calls(tool_calls, TOOL_HOOKS, submitted=claim(tool_calls)):
         # 存储工具调用结果
         st.session_state.tool_responses.append({
-            "tool_call_id": tool_call["id"],
-            "function_name": function_name,
+            "tool_call_id": tool_message["tool_call_id"],
+            "function_name": tool_message["name"],
             "function_args": function_args,
-            "function_response": function_response
+            "function_response": tool_message["content"]
         })
         
         # 将工具响应添加到聊天历史
-        st.session_state.chat_history.append({
-            "tool_call_id": tool_call["id"],
-            "role": "tool",
-            "name": function_name,
-            "content": function_response,
-        })
+        st.session_state.chat_history.append(tool_message)
     
     # 标记需要获取AI的后续响应
     st.session_state.need_ai_response = True
@@ -108,6 +102,7 @@ def confirm_tool_call():
 
 # 回调函数：拒绝工具调用
 def reject_tool_call():
+    discard(st.session_state.pending_tool_calls)
     st.session_state.chat_history.append({"role": "assistant", "content": "您拒绝了工具调用，我将尝试不使用工具来回答您的问题。"})
     st.session_state.pending_tool_calls = None
     # 不需要获取AI的后续响应
@@ -141,6 +136,8 @@ st.caption("🚀 A streamlit chatbot powered by OpenAI LLM")
 with st.sidebar:
     show_history = st.checkbox('Show history', False)
     if st.button("Reset history"):
+        if st.session_state.get("pending_tool_calls"):
+            discard(st.session_state.pending_tool_calls)
         st.session_state.chat_history = [{"role": "assistant", "content": "How can I help you?"}]
         st.session_state.pending_tool_calls = None
         st.session_state.tool_responses = []
@@ -148,8 +145,7 @@ with st.sidebar:
         st.session_state.has_new_message = False
 
 # 显示对话历史
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(st.session_state.chat_history)
 
 # 用户输入处理
 if prompt := st.chat_input():
@@ -166,6 +162,8 @@ if st.session_state.has_new_message and not st.session_state.pending_tool_calls:
     if isinstance(first_item, list):
         # 工具调用，存储以待确认
         st.session_state.pending_tool_calls = first_item
+        # 无副作用的工具在等待确认期间先行执行
+        speculate(first_item, TOOL_HOOKS)
     else:
         # 普通消息，直接显示
         with st.chat_message("assistant"):
@@ -1,13 +1,25 @@
 import streamlit as st
-from openai import OpenAI
+from modules.chat_render import render_history
+from modules.tool_cache import cacheable
+from modules.tool_stream import ToolCallAssembler
+from modules.context_budget import fit_messages
+from modules.stream_metrics import timed
+from modules.llm_client import get_client
+from modules.tool_speculation import side_effect_free, speculate, claim, discard
+from modules.tool_executor import execute_tool_calls
+from modules.session_memory import enforce_memory
 import json
 import itertools
 
+enforce_memory()
 
-client = OpenAI()
+
+client = get_client()
 
 # Example dummy function hard coded to return the same weather
 # In production, this could be your backend API or an external API
+@side_effect_free
+@cacheable(ttl=600)
 def get_current_weather(location, unit="fahrenheit"):
     """Get the current weather in a given location"""
     if "tokyo" in location.lower():
@@ -43,34 +55,25 @@ TOOL_HOOKS = {
     "get_current_weather": get_current_weather,
 }
 
-def chat_stream(messages, model="gpt-4o-mini", tools=[], **kargs):
+@timed("chat_with_tools_and_confirm_by_flow_state")
+def chat_stream(messages, model="gpt-4o-mini", tools=[], on_tool_call=None, **kargs):
     response = client.chat.completions.create(
         model=model,
-        messages=messages,
+        messages=fit_messages(messages, model),
         tools=tools if tools else None,
         stream=True,
         **kargs
     )
-    tool_calls = []
+    assembler = ToolCallAssembler(on_tool_call)
     for chunk in response:
         if chunk and chunk.choices:
             delta = chunk.choices[0].delta
             if delta.tool_calls:
-                tcchunklist = delta.tool_calls
-                for tcchunk in tcchunklist:
-                    if len(tool_calls) <= tcchunk.index:
-                        tool_calls.append({"id": "", "type": "function", "function": { "name": "", "arguments": "" } })
-                    tc = tool_calls[tcchunk.index]
-                    if tcchunk.id:
-                        tc["id"] += tcchunk.id
-                    if tcchunk.function.name:
-                        tc["function"]["name"] += tcchunk.function.name
-                    if tcchunk.function.arguments:
-                        tc["function"]["arguments"] += tcchunk.function.arguments
+                assembler.feed(delta.tool_calls)
             elif delta.content:
                 yield delta.content
-    if tool_calls:
-        yield tool_calls
+    if assembler:
+        yield assembler.finish()
 
 
 st.title("💬 聊天机器人")
@@ -80,6 +83,10 @@ with st.sidebar:
     show_history = st.checkbox('显示历史记录', False)
     reset_history = st.button("重置历史记录")
 
+if reset_history and st.session_state.get("pending_tool_calls"):
+    # 丢弃待确认工具调用的推测执行结果
+    discard(st.session_state.pending_tool_calls)
+
 # 初始化会话状态
 if "chat_history" not in st.session_state or reset_history:
     st.session_state["chat_history"] = [{"role": "assistant", "content": "有什么可以帮到您？"}]
@@ -101,18 +108,7 @@ def confirm_tool_call():
     tool_calls = st.session_state.pending_tool_calls
     st.session_state.chat_history.append({"role": "assistant", "content": "", "tool_calls": tool_calls})
     
-    tool_responses = []
-    for tool_call in tool_calls:
-        function_name = tool_call["function"]["name"]
-        function_args = json.loads(tool_call["function"]["arguments"])
-        function_response = TOOL_HOOKS[function_name](**function_args)
-        
-        tool_responses.append({
-            "tool_call_id": tool_call["id"],
-            "role": "tool",
-            "name": function_name,
-            "content": function_response,
-        })
+    tool_responses = [tool_message for _, tool_message in execute_tool_calls(tool_calls, TOOL_HOOKS, submitted=claim(tool_calls))]
         
     # 更新会话历史
     st.session_state.chat_history.extend(tool_responses)
@@ -124,13 +120,13 @@ def confirm_tool_call():
 
 # 拒绝工具调用的回调函数
 def reject_tool_call():
+    discard(st.session_state.pending_tool_calls)
     st.session_state.chat_history.append({"role": "assistant", "content": "您拒绝了工具调用，我将尝试不使用工具来回答您的问题。"})
     st.session_state.flow_state = "ready"
     st.session_state.pending_tool_calls = None
 
 # 显示对话历史
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(st.session_state.chat_history)
 
 # 处理用户输入
 if prompt := st.chat_input(disabled=st.session_state.flow_state == "pending_confirmation"):
@@ -144,6 +140,8 @@ if prompt := st.chat_input(disabled=st.session_state.flow_state == "pending_conf
     if isinstance(first_item, list):
         # 工具调用，等待用户确认
         st.session_state.pending_tool_calls = first_item
+        # 无副作用的工具在等待确认期间先行执行
+        speculate(first_item, TOOL_HOOKS)
         st.session_state.flow_state = "pending_confirmation"
         st.session_state.temp_response = response  # 保存响应以便后续处理
     else:
@@ -1,13 +1,23 @@
 import streamlit as st
-from openai import OpenAI
+from modules.chat_render import render_history
+from modules.tool_cache import cacheable
+from modules.tool_stream import ToolCallAssembler
+from modules.context_budget import fit_messages
+from modules.stream_metrics import timed
+from modules.llm_client import get_client
+from modules.tool_executor import execute_tool_calls
+from modules.session_memory import enforce_memory
 import json
 import itertools
 
+enforce_memory()
 
-client = OpenAI()
+
+client = get_client()
 
 # Example dummy function hard coded to return the same weather
 # In production, this could be your backend API or an external API
+@cacheable(ttl=600)
 def get_current_weather(location, unit="fahrenheit"):
     """Get the current weather in a given location"""
     if "tokyo" in location.lower():
@@ -43,34 +53,25 @@ TOOL_HOOKS = {
     "get_current_weather": get_current_weather,
 }
 
-def chat_stream(messages, model="gpt-4o-mini", tools=[], **kargs):
+@timed("chat_with_tools_and_confirm_by_rerun_in_fragment")
+def chat_stream(messages, model="gpt-4o-mini", tools=[], on_tool_call=None, **kargs):
     response = client.chat.completions.create(
         model=model,
-        messages=messages,
+        messages=fit_messages(messages, model),
         tools=tools if tools else None,
         stream=True,
         **kargs
     )
-    tool_calls = []
+    assembler = ToolCallAssembler(on_tool_call)
     for chunk in response:
         if chunk and chunk.choices:
             delta = chunk.choices[0].delta
             if delta.tool_calls:
-                tcchunklist = delta.tool_calls
-                for tcchunk in tcchunklist:
-                    if len(tool_calls) <= tcchunk.index:
-                        tool_calls.append({"id": "", "type": "function", "function": { "name": "", "arguments": "" } })
-                    tc = tool_calls[tcchunk.index]
-                    if tcchunk.id:
-                        tc["id"] += tcchunk.id
-                    if tcchunk.function.name:
-                        tc["function"]["name"] += tcchunk.function.name
-                    if tcchunk.function.arguments:
-                        tc["function"]["arguments"] += tcchunk.function.arguments
+                assembler.feed(delta.tool_calls)
             elif delta.content:
                 yield delta.content
-    if tool_calls:
-        yield tool_calls
+    if assembler:
+        yield assembler.finish()
 
 
 st.title("💬 Chatbot")
@@ -86,8 +87,7 @@ if "chat_history" not in st.session_state or reset_history:
     st.session_state["tool_call_confirmed"] = False
     st.session_state["waiting_for_confirmation"] = False
 
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(st.session_state.chat_history)
 
 # 定义插件确认界面函数
 @st.fragment
@@ -123,21 +123,11 @@ def tool_execution():
         tool_calls = st.session_state.pending_tool_calls
         st.session_state.chat_history.append({"role": "assistant", "content": "", "tool_calls": tool_calls})
         
-        for tool_call in tool_calls:
-            function_name = tool_call["function"]["name"]
-            function_args = json.loads(tool_call["function"]["arguments"])
-            function_response = TOOL_HOOKS[function_name](**function_args)
+        for function_args, tool_message in execute_tool_calls(tool_calls, TOOL_HOOKS):
             with st.chat_message("tool", avatar='🛠️'):
-                with st.status(f"调用插件: {function_name} 使用参数: {function_args}"):
-                    st.write(function_response)
-            st.session_state.chat_history.append(
-                {
-                    "tool_call_id": tool_call["id"],
-                    "role": "tool",
-                    "name": function_name,
-                    "content": function_response,
-                }
-            )
+                with st.status(f"调用插件: {tool_message['name']} 使用参数: {function_args}"):
+                    st.write(tool_message["content"])
+            st.session_state.chat_history.append(tool_message)
         
         with st.chat_message("assistant"):
             stream = chat_stream(st.session_state.chat_history, tools=[])
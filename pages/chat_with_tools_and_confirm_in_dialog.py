@@ -1,13 +1,26 @@
 import streamlit as st
-from openai import OpenAI
+from modules.chat_render import render_history
+from modules.tool_cache import cacheable
+from modules.tool_stream import ToolCallAssembler
+from modules.context_budget import fit_messages
+from modules.stream_metrics import timed
+from modules.llm_client import get_client
+from modules.tool_executor import execute_tool_calls, tool_result
+from modules.rerun_stats import begin_run, end_run, rerun, new_turn, turn_stats
+from modules.tool_speculation import side_effect_free, speculate, claim, discard, speculation_stats
+from modules.session_memory import enforce_memory
 import json
 import itertools
 
+enforce_memory()
 
-client = OpenAI()
+
+client = get_client()
 
 # Example dummy function hard coded to return the same weather
 # In production, this could be your backend API or an external API
+@side_effect_free
+@cacheable(ttl=600)
 def get_current_weather(location, unit="fahrenheit"):
     """Get the current weather in a given location"""
     if "tokyo" in location.lower():
@@ -43,54 +56,63 @@ TOOL_HOOKS = {
     "get_current_weather": get_current_weather,
 }
 
-def chat_stream(messages, model="gpt-4o-mini", tools=[], **kargs):
+@timed("chat_with_tools_and_confirm_in_dialog")
+def chat_stream(messages, model="gpt-4o-mini", tools=[], on_tool_call=None, **kargs):
     response = client.chat.completions.create(
         model=model,
-        messages=messages,
+        messages=fit_messages(messages, model),
         tools=tools if tools else None,
         stream=True,
         **kargs
     )
-    tool_calls = []
+    assembler = ToolCallAssembler(on_tool_call)
     for chunk in response:
         if chunk and chunk.choices:
             delta = chunk.choices[0].delta
             if delta.tool_calls:
-                tcchunklist = delta.tool_calls
-                for tcchunk in tcchunklist:
-                    if len(tool_calls) <= tcchunk.index:
-                        tool_calls.append({"id": "", "type": "function", "function": { "name": "", "arguments": "" } })
-                    tc = tool_calls[tcchunk.index]
-                    if tcchunk.id:
-                        tc["id"] += tcchunk.id
-                    if tcchunk.function.name:
-                        tc["function"]["name"] += tcchunk.function.name
-                    if tcchunk.function.arguments:
-                        tc["function"]["arguments"] += tcchunk.function.arguments
+                assembler.feed(delta.tool_calls)
             elif delta.content:
                 yield delta.content
-    if tool_calls:
-        yield tool_calls
+    if assembler:
+        yield assembler.finish()
+
 
+begin_run()
 
 st.title("💬 Chatbot")
 st.caption("🚀 A streamlit chatbot powered by OpenAI LLM")
 
 with st.sidebar:
     show_history = st.checkbox('Show history', False)
+    # 批量模式: 一次对话框提交确认/拒绝本轮全部工具调用
+    batch_confirm = st.toggle("批量确认工具调用", True)
     reset_history = st.button("reset history")
+    with st.expander("Speculation stats"):
+        st.json(speculation_stats())
+    with st.expander("Rerun stats"):
+        st.json(turn_stats())
+
+if reset_history:
+    # 丢弃还在等待确认的工具调用及其推测执行结果
+    pending = list(st.session_state.get("tool_call_queue", []))
+    if st.session_state.get("current_tool_for_confirmation"):
+        pending.append(st.session_state.current_tool_for_confirmation)
+    discard(pending)
+    st.session_state.tool_call_queue = []
+    st.session_state.tool_responses = []
+    st.session_state.dialog_outcomes = {}
+    st.session_state.current_tool_for_confirmation = None
 
 if "chat_history" not in st.session_state or reset_history:
     st.session_state["chat_history"] = [{"role": "assistant", "content": "How can I help you?"}]
 
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+render_history(st.session_state.chat_history)
 
 @st.dialog(title="调用工具确认")
 def tool_confirmation_dialog(tool_id_for_dialog: str, function_name: str, function_args_dict: dict):
     """
     显示工具调用确认对话框。
-    用户点击按钮后，会更新 session_state 并触发 st.rerun()。
+    用户点击按钮后，会更新 session_state 并触发 rerun()。
     """
     st.write(f"请确认是否执行以下工具调用：")
     st.markdown(f"**插件名称:** `{function_name}`")
@@ -102,11 +124,38 @@ def tool_confirmation_dialog(tool_id_for_dialog: str, function_name: str, functi
     with col1:
         if st.button("确认执行", key=f"confirm_btn_{tool_id_for_dialog}", type="primary"):
             st.session_state.dialog_outcomes[tool_id_for_dialog] = True
-            st.rerun()
+            rerun()
     with col2:
         if st.button("拒绝执行", key=f"deny_btn_{tool_id_for_dialog}"):
             st.session_state.dialog_outcomes[tool_id_for_dialog] = False
-            st.rerun()
+            rerun()
+
+@st.dialog(title="批量确认工具调用")
+def batch_confirmation_dialog(tool_calls: list):
+    """
+    一次性确认本轮所有工具调用, 提交后只触发一次 rerun()。
+    """
+    st.write("请确认是否执行以下工具调用：")
+    with st.form("batch_tool_confirmation"):
+        approvals = {}
+        for tool_call in tool_calls:
+            st.markdown(f"**插件名称:** `{tool_call['function']['name']}`")
+            try:
+                st.json(json.loads(tool_call["function"]["arguments"]))
+            except json.JSONDecodeError:
+                st.code(tool_call["function"]["arguments"])
+            approvals[tool_call["id"]] = st.checkbox("执行", value=True, key=f"approve_{tool_call['id']}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            submitted = st.form_submit_button("提交", type="primary")
+        with col2:
+            reject_all = st.form_submit_button("全部拒绝")
+
+    if submitted or reject_all:
+        for tool_id, approved in approvals.items():
+            st.session_state.dialog_outcomes[tool_id] = approved and not reject_all
+        rerun()
 
 # Initialize session state variables for tool call processing
 if "tool_call_queue" not in st.session_state:
@@ -119,6 +168,7 @@ if "current_tool_for_confirmation" not in st.session_state: # Stores the tool_ca
     st.session_state.current_tool_for_confirmation = None
 
 if prompt := st.chat_input():
+    new_turn()
     st.session_state.chat_history.append({"role": "user", "content": prompt})
     st.chat_message("user").write(prompt)
     
@@ -145,7 +195,10 @@ if prompt := st.chat_input():
         # Content is None for now, will be filled by LLM after tool execution
         st.session_state.chat_history.append({"role": "assistant", "content": None, "tool_calls": tool_calls})
         st.session_state.tool_call_queue.extend(tool_calls)
-        st.rerun() # Rerun to start processing the tool_call_queue
+        # 无副作用的工具在弹出确认框的同时先行执行
+        speculate(tool_calls, TOOL_HOOKS)
+        if not batch_confirm:
+            rerun() # Rerun to start processing the tool_call_queue
     elif first_chunk is not None: # Normal text response
         with st.chat_message("assistant"):
             # Reconstruct the full stream for st.write_stream
@@ -162,13 +215,43 @@ if prompt := st.chat_input():
 # --- Tool processing logic ---
 # This block runs on every rerun if there are tools in the queue or one being confirmed.
 
-if not st.session_state.current_tool_for_confirmation and st.session_state.tool_call_queue:
+if batch_confirm and st.session_state.tool_call_queue:
+    queued = st.session_state.tool_call_queue
+    if all(tool_call["id"] in st.session_state.dialog_outcomes for tool_call in queued):
+        # 所有决定已在一次提交中给出, 批准的工具并发执行, 结果按 tool_call 顺序写回
+        approved = [tc for tc in queued if st.session_state.dialog_outcomes[tc["id"]]]
+        rejected = [tc for tc in queued if not st.session_state.dialog_outcomes[tc["id"]]]
+        discard(rejected)
+        results = {
+            tool_message["tool_call_id"]: (function_args, tool_message)
+            for function_args, tool_message in execute_tool_calls(approved, TOOL_HOOKS, submitted=claim(approved))
+        }
+        for tool_call in queued:
+            function_name = tool_call["function"]["name"]
+            if tool_call["id"] in results:
+                function_args, tool_message = results[tool_call["id"]]
+                with st.chat_message("tool", avatar='🛠️'):
+                    with st.status(f"插件 {function_name} 执行完毕", state="complete"):
+                        st.write(f"参数: {function_args}")
+                        st.write(tool_message["content"])
+                st.session_state.tool_responses.append(tool_message)
+            else:
+                st.warning(f"用户已拒绝执行工具: {function_name}")
+                st.session_state.tool_responses.append({
+                    "tool_call_id": tool_call["id"], "role": "tool", "name": function_name,
+                    "content": f"User denied tool call for {function_name}."
+                })
+        st.session_state.tool_call_queue = []
+    else:
+        batch_confirmation_dialog(queued)
+
+if not batch_confirm and not st.session_state.current_tool_for_confirmation and st.session_state.tool_call_queue:
     # Pick the next tool to confirm from the queue
     st.session_state.current_tool_for_confirmation = st.session_state.tool_call_queue.pop(0)
     # Clear any old outcome for this tool_id in case of re-confirmation (though unlikely in this flow)
     if st.session_state.current_tool_for_confirmation['id'] in st.session_state.dialog_outcomes:
         del st.session_state.dialog_outcomes[st.session_state.current_tool_for_confirmation['id']]
-    st.rerun() # Rerun to process the newly selected tool for confirmation
+    rerun() # Rerun to process the newly selected tool for confirmation
 
 if st.session_state.current_tool_for_confirmation:
     tool_to_confirm = st.session_state.current_tool_for_confirmation
@@ -184,7 +267,7 @@ if st.session_state.current_tool_for_confirmation:
             "content": f"Error: Invalid arguments format for tool {function_name}."
         })
         st.session_state.current_tool_for_confirmation = None # Move to next or finish
-        st.rerun()
+        rerun()
 
     decision = st.session_state.dialog_outcomes.get(tool_id)
 
@@ -192,7 +275,7 @@ if st.session_state.current_tool_for_confirmation:
         # No decision yet, show the dialog.
         tool_confirmation_dialog(tool_id, function_name, function_args)
         # The script execution will end here. User interaction with the dialog will set
-        # st.session_state.dialog_outcomes[tool_id] and trigger st.rerun().
+        # st.session_state.dialog_outcomes[tool_id] and trigger rerun().
         # On the next rerun, 'decision' will be populated.
     elif decision is True: # User confirmed
         # Displaying the tool execution status
@@ -202,7 +285,12 @@ if st.session_state.current_tool_for_confirmation:
                 st.write(f"正在执行 {function_name}...")
                 st.write(f"参数: {function_args}")
                 try:
-                    function_response_content = TOOL_HOOKS[function_name](**function_args)
+                    speculated = claim([tool_to_confirm]).get(tool_id)
+                    if speculated:
+                        # 推测执行出错时这里会抛出原异常, 按失败展示
+                        function_response_content = tool_result(tool_to_confirm, speculated[1])
+                    else:
+                        function_response_content = TOOL_HOOKS[function_name](**function_args)
                     st.write("执行成功!")
                     st.write("结果:")
                     try:
@@ -221,16 +309,17 @@ if st.session_state.current_tool_for_confirmation:
             "tool_call_id": tool_id, "role": "tool", "name": function_name, "content": function_response_content
         })
         st.session_state.current_tool_for_confirmation = None # Done with this one
-        st.rerun() # Rerun to process next in queue or finalize
+        rerun() # Rerun to process next in queue or finalize
 
     elif decision is False: # User denied
+        discard([tool_to_confirm])
         st.warning(f"用户已拒绝执行工具: {function_name}")
         function_response_content = f"User denied tool call for {function_name}."
         st.session_state.tool_responses.append({
             "tool_call_id": tool_id, "role": "tool", "name": function_name, "content": function_response_content
         })
         st.session_state.current_tool_for_confirmation = None # Done with this one
-        st.rerun() # Rerun to process next in queue or finalize
+        rerun() # Rerun to process next in queue or finalize
 
 # After all tools in queue are processed and no tool is currently being confirmed
 if not st.session_state.tool_call_queue and \
@@ -261,7 +350,9 @@ if not st.session_state.tool_call_queue and \
     st.session_state.tool_responses = [] 
     st.session_state.dialog_outcomes = {} 
     # tool_call_queue and current_tool_for_confirmation should be empty/None already
-    st.rerun() # Rerun to reflect the final assistant message and clear state.
+    rerun() # Rerun to reflect the final assistant message and clear state.
     
 if show_history:
     st.write(st.session_state.chat_history)
+
+end_run()
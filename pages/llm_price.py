@@ -1,8 +1,9 @@
 import streamlit as st
-import json
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from modules.model_prices import data_signature, prepare_dataframe
+from modules.cost_projection import WORKLOAD_DIR, project_costs, resolve_workload, workload_files
+from modules.price_index import price_index
 
 # 设置页面配置
 st.set_page_config(
@@ -14,72 +15,31 @@ st.set_page_config(
 # 标题
 st.title("🤖 大语言模型价格和上下文窗口对比")
 
-# 加载数据
-@st.cache_data
-def load_model_data():
-    with open("data/model_prices_and_context_window.json", "r") as f:
-        data = json.load(f)
-    return data
-
-model_data = load_model_data()
-
-# 准备数据
-def prepare_dataframe():
-    models_info = []
-    
-    for model_name, model_info in model_data.items():
-        # 跳过第一个样本规格
-        if model_name == "sample_spec":
-            continue
-            
-        # 只处理有价格信息的模型
-        if "input_cost_per_token" in model_info and "output_cost_per_token" in model_info:
-            input_cost = model_info.get("input_cost_per_token", 0)
-            output_cost = model_info.get("output_cost_per_token", 0)
-            max_input_tokens = model_info.get("max_input_tokens", model_info.get("max_tokens", 0))
-            max_output_tokens = model_info.get("max_output_tokens", model_info.get("max_tokens", 0))
-            
-            # 添加提供商信息
-            provider = model_info.get("litellm_provider", "未知")
-            
-            # 添加到列表
-            models_info.append({
-                "模型名称": model_name,
-                "提供商": provider,
-                "输入价格(每百万tokens)": input_cost * 1000000,  # 转换为每百万tokens的价格
-                "输出价格(每百万tokens)": output_cost * 1000000,  # 转换为每百万tokens的价格
-                "最大输入tokens": max_input_tokens,
-                "最大输出tokens": max_output_tokens,
-                "模式": model_info.get("mode", "未知")
-            })
-    
-    return pd.DataFrame(models_info)
-
 df = prepare_dataframe()
+index = price_index()
 
 # 侧边栏过滤器
 st.sidebar.header("过滤选项")
 
 # 根据提供商过滤
-providers = ["所有提供商"] + sorted(df["提供商"].unique().tolist())
+providers = ["所有提供商"] + sorted(df["提供商"].cat.categories.tolist())
 selected_provider = st.sidebar.selectbox("选择提供商", providers)
 
 # 根据模式过滤
-modes = ["所有模式"] + sorted(df["模式"].unique().tolist())
+modes = ["所有模式"] + sorted(df["模式"].cat.categories.tolist())
 selected_mode = st.sidebar.selectbox("选择模式", modes)
 
-# 应用过滤
-filtered_df = df.copy()
-if selected_provider != "所有提供商":
-    filtered_df = filtered_df[filtered_df["提供商"] == selected_provider]
-if selected_mode != "所有模式":
-    filtered_df = filtered_df[filtered_df["模式"] == selected_mode]
+# 应用过滤 (倒排表取交集, 结果为按输入价格从高到低排列的行号)
+provider = None if selected_provider == "所有提供商" else selected_provider
+mode = None if selected_mode == "所有模式" else selected_mode
+filtered_rows = index.filter_rows(provider, mode)
+filtered_df = df.iloc[filtered_rows]
 
 # 限制显示的模型数量
 max_models_to_show = st.sidebar.slider("显示模型数量", 5, 50, 20)
 
 # 按输入价格排序
-sorted_df = filtered_df.sort_values(by="输入价格(每百万tokens)", ascending=False).head(max_models_to_show)
+sorted_df = df.iloc[filtered_rows[:max_models_to_show]]
 
 # 创建两列布局
 col1, col2 = st.columns(2)
@@ -156,14 +116,11 @@ st.subheader("模型价格数据表")
 # 添加搜索框
 search_term = st.text_input("搜索模型名称")
 
-# 根据搜索词过滤
+# 根据搜索词过滤, 有搜索词时按匹配程度排序, 否则按输入价格排序
 if search_term:
-    display_df = filtered_df[filtered_df["模型名称"].str.contains(search_term, case=False)]
+    display_df = df.iloc[index.search(provider, mode, search_term)]
 else:
     display_df = filtered_df
-
-# 排序并显示表格
-display_df = display_df.sort_values(by="输入价格(每百万tokens)", ascending=False)
 st.dataframe(display_df, use_container_width=True)
 
 # 额外的分析部分
@@ -185,6 +142,62 @@ scatter_fig = px.scatter(
 scatter_fig.update_layout(height=600)
 st.plotly_chart(scatter_fig, use_container_width=True)
 
+# 工作负载成本预估
+st.subheader("工作负载成本预估")
+st.caption("每行一个请求, 包含 input_tokens/output_tokens (或 prompt_tokens/completion_tokens) 列; 按上面的提供商/模式过滤, 对所有模型同时计算")
+
+
+@st.cache_data(show_spinner="正在计算成本...", max_entries=8)
+def workload_costs(source_key, signature, provider, mode, _source):
+    return project_costs(_source, df, index.filter_rows(provider, mode))
+
+
+workload_file = st.file_uploader("上传 CSV / JSONL / JSON 工作负载", type=["csv", "jsonl", "ndjson", "json"])
+# 服务器上的文件只能从 STREAMLIT_DEMO_WORKLOAD_DIR 中选择, 不接受任意路径
+workload_name = None
+if WORKLOAD_DIR:
+    workload_name = st.selectbox("或服务器上的日志文件 (大文件按块流式读取)", workload_files(), index=None)
+
+workload_source = source_key = None
+if workload_file is not None:
+    workload_source = workload_file
+    source_key = f"upload:{workload_file.name}:{workload_file.size}:{getattr(workload_file, 'file_id', '')}"
+elif workload_name:
+    try:
+        workload_source = resolve_workload(workload_name)
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        stat = workload_source.stat()
+        source_key = f"path:{workload_source}:{stat.st_mtime_ns}:{stat.st_size}"
+
+if workload_source is not None:
+    try:
+        costs, workload = workload_costs(source_key, data_signature(), provider, mode, workload_source)
+    except ValueError as e:
+        st.error(f"无法读取工作负载: {e}")
+    else:
+        c1, c2, c3 = st.columns(3)
+        c1.metric("请求数", f"{workload['requests']:,}")
+        c2.metric("输入 tokens", f"{workload['input_tokens']:,}")
+        c3.metric("输出 tokens", f"{workload['output_tokens']:,}")
+
+        cheapest = costs.head(max_models_to_show)
+        cost_fig = go.Figure(go.Bar(
+            x=cheapest["模型名称"],
+            y=cheapest["总成本($)"],
+            name="总成本",
+            marker_color='goldenrod'
+        ))
+        cost_fig.update_layout(
+            xaxis_tickangle=-45,
+            height=500,
+            margin=dict(l=20, r=20, t=30, b=150),
+            yaxis_title="总成本 ($)"
+        )
+        st.plotly_chart(cost_fig, use_container_width=True)
+        st.dataframe(costs, use_container_width=True)
+
 # 添加页脚
 st.markdown("---")
 st.markdown("📊 数据来源: model_prices_and_context_window.json")
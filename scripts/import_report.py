@@ -0,0 +1,117 @@
+"""
+按页面统计导入耗时 (python -X importtime), 并检查是否超出预算
+
+每个页面在独立子进程中以 bare 模式执行一次 (相当于首次访问), 减去只导入 streamlit 时已加载的模块,
+剩下的就是该页面首次访问额外付出的导入耗时
+
+    python scripts/import_report.py
+    python scripts/import_report.py --budget-ms 800 --budgets import_budgets.json --json
+    # import_budgets.json: {"pages/llm_price.py": 1500, "pages/chart.py": 2000}
+
+有页面超出预算时退出码为 1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from modules.page_registry import discover_pages
+
+RUN_PAGE = """
+import runpy, sys
+sys.path.insert(0, {root!r})
+import streamlit
+# bare 模式下首次渲染会打印警告, 判断是否为 REPL 时 inspect.stack() 会遍历 sys.modules 读取 __file__,
+# 导致所有延迟导入的模块被提前加载, 统计结果与 streamlit run 不符
+import streamlit.delta_generator
+streamlit.delta_generator._use_warning_has_been_displayed = True
+try:
+    runpy.run_path({page!r}, run_name="__main__")
+except BaseException as e:
+    print(f"page error: {{type(e).__name__}}: {{e}}", file=sys.stderr)
+"""
+
+
+def import_times(code):
+    """执行代码, 返回 ({模块名: 自身导入耗时 us}, 错误信息)"""
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-import-report")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=ROOT, env=env,
+    )
+    times, errors = {}, []
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:"):
+            parts = line[len("import time:"):].split("|")
+            if len(parts) == 3 and parts[0].strip().isdigit():
+                times[parts[2].strip()] = int(parts[0])
+        elif line.startswith("page error:"):
+            errors.append(line)
+    return times, errors
+
+
+def page_report(page, baseline, top):
+    times, errors = import_times(RUN_PAGE.format(root=ROOT, page=page))
+    extra = {name: us for name, us in times.items() if name not in baseline}
+    heaviest = sorted(extra.items(), key=lambda item: item[1], reverse=True)[:top]
+    # 按顶层包汇总, 便于看出是哪个依赖最重
+    packages = {}
+    for name, us in extra.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + us
+    return {
+        "page": page,
+        "import_ms": round(sum(extra.values()) / 1000, 1),
+        "modules": len(extra),
+        "packages": {k: round(v / 1000, 1) for k, v in sorted(packages.items(), key=lambda i: i[1], reverse=True)[:top]},
+        "heaviest_modules": {k: round(v / 1000, 1) for k, v in heaviest},
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-page import time report")
+    parser.add_argument("--pages", nargs="*", help="默认统计 pages 目录下的所有页面")
+    parser.add_argument("--budget-ms", type=float, default=1000, help="默认每页导入耗时预算")
+    parser.add_argument("--budgets", help="按页面设置预算的 JSON 文件 {页面路径: 毫秒}")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    budgets = {}
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+
+    baseline, _ = import_times("import streamlit")
+    pages = args.pages or [path for paths in discover_pages().values() for path in paths]
+    reports = []
+    for page in pages:
+        report = page_report(page, baseline, args.top)
+        report["budget_ms"] = budgets.get(page, args.budget_ms)
+        report["over_budget"] = report["import_ms"] > report["budget_ms"]
+        reports.append(report)
+    reports.sort(key=lambda r: r["import_ms"], reverse=True)
+
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'page':<60}{'import ms':>10}{'budget':>10}  heaviest packages")
+        for r in reports:
+            flag = " !" if r["over_budget"] else ""
+            packages = ", ".join(f"{k} {v}" for k, v in r["packages"].items())
+            print(f"{r['page']:<60}{r['import_ms']:>10}{r['budget_ms']:>10}{flag}  {packages}")
+
+    over = [r["page"] for r in reports if r["over_budget"]]
+    if over:
+        print(f"over budget: {', '.join(over)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+并发会话压测: 按 page_main.py 的方式发现页面, 每个页面用 N 个并发的模拟会话执行脚本化交互,
+输出每个页面的脚本运行耗时分位数, 每秒 rerun 数, 每会话 RSS 增长和错误数 (JSON)
+
+会话由 streamlit.testing.v1.AppTest 在本进程内模拟, 与 streamlit run 的服务进程一样共享缓存和模块,
+但不经过 websocket; tab 切换在前端完成不会触发 rerun, 因此不单独模拟
+
+    python scripts/load_test.py --sessions 20 --output load_test.json
+    python scripts/load_test.py --pages pages/chat.py pages/basic.py --sessions 50 --steps 5
+    # 聊天页面可配合 scripts/mock_llm_server.py
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=sk-mock python scripts/load_test.py
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+from modules.page_registry import discover_pages
+
+PROMPT = "What's the weather like in Tokyo?"
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def uncaught_exception(at):
+    """
+    脚本未捕获的异常: Streamlit 会把它作为主区域的最后一个元素渲染, 脚本随之结束;
+    页面自己用 st.exception 展示的异常 (如 basic.py 的示例) 不算错误
+    """
+    children = list(at.main.children.values())
+    if children and children[-1].type == "exception":
+        return children[-1]
+    return None
+
+
+def run_session(page, steps, timeout):
+    """模拟一个会话: 首次加载, 然后依次发送聊天输入/点击按钮/切换复选框, 返回每次运行的耗时和错误"""
+    timings, errors = [], []
+
+    def timed(action):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return False
+        timings.append(time.perf_counter() - start)
+        error = uncaught_exception(at)
+        if error is not None:
+            errors.append(str(error.message))
+            return False
+        return True
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+    if not timed(at.run):
+        return timings, errors
+    for step in range(steps):
+        if at.chat_input:
+            ok = timed(lambda: at.chat_input[0].set_value(PROMPT).run())
+        elif at.button:
+            ok = timed(lambda: at.button[step % len(at.button)].click().run())
+        elif at.checkbox:
+            checkbox = at.checkbox[step % len(at.checkbox)]
+            ok = timed(lambda: checkbox.set_value(not checkbox.value).run())
+        else:
+            ok = timed(at.run)
+        if not ok:
+            break
+    return timings, errors
+
+
+def run_page(page, sessions, steps, timeout):
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(lambda _: run_session(page, steps, timeout), range(sessions)))
+    wall = time.perf_counter() - start
+    rss_after = rss_bytes()
+    timings = [t for session_timings, _ in results for t in session_timings]
+    errors = [e for _, session_errors in results for e in session_errors]
+    report = {
+        "page": page,
+        "sessions": sessions,
+        "runs": len(timings),
+        "reruns_per_second": round(len(timings) / wall, 2) if wall else 0,
+        "rss_growth_per_session_bytes": (rss_after - rss_before) // sessions,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+    }
+    if timings:
+        report["mean_ms"] = round(statistics.mean(timings) * 1000, 2)
+        for q in (50, 95, 99):
+            report[f"p{q}_ms"] = round(_percentile(timings, q) * 1000, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="concurrent session load test for streamlit pages")
+    parser.add_argument("--pages", nargs="*", help="默认压测 pages 目录下的所有页面")
+    parser.add_argument("--sessions", type=int, default=10, help="每个页面的并发会话数")
+    parser.add_argument("--steps", type=int, default=3, help="每个会话在首次加载后的交互次数")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="结果 JSON 文件, 默认输出到 stdout")
+    args = parser.parse_args()
+
+    pages = args.pages or [path for paths in discover_pages().values() for path in paths]
+    reports = []
+    for page in pages:
+        report = run_page(page, args.sessions, args.steps, args.timeout)
+        reports.append(report)
+        print(f"{page}: {report.get('p50_ms')} ms p50, {report['errors']} errors", file=sys.stderr)
+
+    result = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sessions": args.sessions,
+        "steps": args.steps,
+        "python": sys.version.split()[0],
+        "pages": reports,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
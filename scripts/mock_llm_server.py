@@ -0,0 +1,283 @@
+"""
+本地 OpenAI 兼容的 LLM 替身服务, 用于离线调试和压测聊天页面
+
+回放模式 (默认): 按请求内容的哈希查找录制的会话并按延迟分布回放, 找不到时生成模拟回复
+(请求带 tools 时生成一次 tool_call, 与 chat_stream 解析的增量格式一致)
+
+    python scripts/mock_llm_server.py --port 8000 --ttft normal:0.4,0.1 --itl lognormal:-3.5,0.5 --seed 1
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=sk-mock streamlit run main.py
+
+录制模式: 转发到真实接口, 同时把流式 chunk 和时间戳写入 --sessions 目录
+
+    python scripts/mock_llm_server.py --record --upstream https://api.openai.com/v1
+
+--ttft/--itl 支持 const:x, uniform:a,b, normal:mu,sigma, lognormal:mu,sigma, recorded (使用录制时的间隔)
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_RESPONSE = "This is mock response for test."
+
+
+class Delay:
+    def __init__(self, spec, rng):
+        self.spec = spec
+        self.rng = rng
+        self.lock = threading.Lock()
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",")] if params else []
+
+    def sample(self, recorded=0.0):
+        if self.kind == "recorded":
+            return recorded
+        with self.lock:
+            if self.kind == "const":
+                value = self.params[0]
+            elif self.kind == "uniform":
+                value = self.rng.uniform(*self.params)
+            elif self.kind == "normal":
+                value = self.rng.gauss(*self.params)
+            elif self.kind == "lognormal":
+                value = self.rng.lognormvariate(*self.params)
+            else:
+                raise ValueError(f"unknown delay spec: {self.spec}")
+        return max(0.0, value)
+
+
+def request_key(body):
+    payload = {k: body.get(k) for k in ("model", "messages", "tools")}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _stable_id(seed, key, kind):
+    # id 由 seed 和请求哈希决定, 同一 seed 下每次运行生成的 tool_call id 相同, 后续轮次的请求哈希才能匹配录制数据
+    return hashlib.sha256(f"{seed}:{key}:{kind}".encode()).hexdigest()[:24]
+
+
+def synthesize(body, seed=None):
+    """没有录制数据时生成模拟的流式 chunk 列表, 时间戳为 0 表示全部使用延迟分布"""
+    model = body.get("model", "mock")
+    key = request_key(body)
+    completion_id = f"chatcmpl-{_stable_id(seed, key, 'completion')}"
+    messages = body.get("messages") or []
+    tools = body.get("tools") or []
+    chunks = [_chunk(completion_id, model, {"role": "assistant", "content": ""})]
+    if tools and messages and messages[-1].get("role") == "user":
+        function = tools[0]["function"]
+        prompt = messages[-1].get("content") or ""
+        if not isinstance(prompt, str):
+            prompt = " ".join(p.get("text", "") for p in prompt if isinstance(p, dict))
+        required = function.get("parameters", {}).get("required", [])
+        arguments = json.dumps({name: prompt for name in required}, ensure_ascii=False)
+        chunks.append(_chunk(completion_id, model, {"tool_calls": [{
+            "index": 0, "id": f"call_{_stable_id(seed, key, 'tool_call')}", "type": "function",
+            "function": {"name": function["name"], "arguments": ""},
+        }]}))
+        for i in range(0, len(arguments), 8):
+            chunks.append(_chunk(completion_id, model, {"tool_calls": [{
+                "index": 0, "function": {"arguments": arguments[i:i + 8]},
+            }]}))
+        chunks.append(_chunk(completion_id, model, {}, "tool_calls"))
+    else:
+        for word in MOCK_RESPONSE.split():
+            chunks.append(_chunk(completion_id, model, {"content": word + " "}))
+        chunks.append(_chunk(completion_id, model, {}, "stop"))
+    return [{"t": 0.0, "data": c} for c in chunks]
+
+
+def assemble(chunks):
+    """把流式 chunk 合并为非流式的 chat.completion 响应"""
+    first = chunks[0]["data"]
+    content, tool_calls, finish_reason = [], [], None
+    for item in chunks:
+        choice = item["data"]["choices"][0]
+        delta = choice["delta"]
+        finish_reason = choice.get("finish_reason") or finish_reason
+        if delta.get("content"):
+            content.append(delta["content"])
+        for tc in delta.get("tool_calls") or []:
+            while len(tool_calls) <= tc["index"]:
+                tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": []}})
+            target = tool_calls[tc["index"]]
+            target["id"] += tc.get("id") or ""
+            target["function"]["name"] += tc.get("function", {}).get("name") or ""
+            target["function"]["arguments"].append(tc.get("function", {}).get("arguments") or "")
+    for tc in tool_calls:
+        tc["function"]["arguments"] = "".join(tc["function"]["arguments"])
+    message = {"role": "assistant", "content": "".join(content) or None}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {
+        "id": first["id"], "object": "chat.completion", "created": first["created"], "model": first["model"],
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        try:
+            if self.config.record:
+                self._record(body)
+            else:
+                self._replay(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前断开
+            self.close_connection = True
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_event(self, data):
+        payload = f"data: {data}\n\n".encode()
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self._send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _replay(self, body):
+        config = self.config
+        path = os.path.join(config.sessions, request_key(body) + ".json")
+        if os.path.exists(path):
+            with open(path) as f:
+                chunks = json.load(f)["chunks"]
+        else:
+            chunks = synthesize(body, config.seed)
+        if not body.get("stream"):
+            time.sleep(config.ttft.sample(chunks[0]["t"]))
+            self._json(200, assemble(chunks))
+            return
+        self._start_stream()
+        previous = 0.0
+        for i, item in enumerate(chunks):
+            delay = config.ttft if i == 0 else config.itl
+            time.sleep(delay.sample(item["t"] - previous))
+            previous = item["t"]
+            self._send_event(json.dumps(item["data"], ensure_ascii=False))
+        self._end_stream()
+
+    def _record(self, body):
+        config = self.config
+        request = urllib.request.Request(
+            config.upstream.rstrip("/") + "/chat/completions",
+            data=json.dumps({**body, "stream": True}).encode(),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": self.headers.get("Authorization") or f"Bearer {os.getenv('OPENAI_API_KEY', '')}",
+            },
+        )
+        start = time.perf_counter()
+        chunks = []
+        stream = body.get("stream")
+        try:
+            upstream = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            # 原样转发上游的错误状态和内容, 不录制
+            data = e.read()
+            self.send_response(e.code)
+            self.send_header("Content-Type", e.headers.get("Content-Type", "application/json"))
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        except urllib.error.URLError as e:
+            self._json(502, {"error": {"message": f"upstream unavailable: {e.reason}"}})
+            return
+        with upstream:
+            if stream:
+                self._start_stream()
+            for line in upstream:
+                line = line.decode().strip()
+                if not line.startswith("data:") or line == "data: [DONE]":
+                    continue
+                data = json.loads(line[len("data:"):])
+                chunks.append({"t": time.perf_counter() - start, "data": data})
+                if stream:
+                    self._send_event(json.dumps(data, ensure_ascii=False))
+        if stream:
+            self._end_stream()
+        else:
+            self._json(200, assemble(chunks))
+        os.makedirs(config.sessions, exist_ok=True)
+        with open(os.path.join(config.sessions, request_key(body) + ".json"), "w") as f:
+            json.dump({"request": body, "chunks": chunks}, f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--sessions", default="data/llm_sessions", help="录制会话目录")
+    parser.add_argument("--ttft", default="const:0.3", help="首 token 延迟分布")
+    parser.add_argument("--itl", default="const:0.05", help="token 间隔分布")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--record", action="store_true", help="转发到 --upstream 并录制")
+    parser.add_argument("--upstream", default="https://api.openai.com/v1")
+    parser.add_argument("--verbose", action="store_true")
+    config = parser.parse_args()
+    rng = random.Random(config.seed)
+    config.ttft = Delay(config.ttft, rng)
+    config.itl = Delay(config.itl, rng)
+
+    Handler.config = config
+    server = ThreadingHTTPServer((config.host, config.port), Handler)
+    mode = "record" if config.record else "replay"
+    print(f"mock llm server ({mode}) listening on http://{config.host}:{config.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
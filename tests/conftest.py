@@ -0,0 +1,16 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+import streamlit as st
+
+
+@pytest.fixture
+def session_state():
+    """bare 模式下的 st.session_state, 每个测试前后清空"""
+    st.session_state.clear()
+    yield st.session_state
+    st.session_state.clear()
@@ -0,0 +1,18 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _app():
+    from modules.chat_render import render_history
+
+    history = [{"role": "user", "content": f"message {i}"} for i in range(120)]
+    render_history(history, window=50, page_size=30)
+
+
+def test_renders_only_the_window_and_pages_earlier_messages():
+    at = AppTest.from_function(_app)
+    at.run()
+    assert len(at.chat_message) == 50
+    assert at.chat_message[-1].markdown[0].value == "message 119"
+    at.button[0].click().run()
+    assert len(at.chat_message) == 80
+    assert at.chat_message[0].markdown[0].value == "message 40"
@@ -0,0 +1,35 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_reasoning_is_kept_out_of_chat_history(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "chat_with_resoning.py"))
+    at.run()
+    at.chat_input[0].set_value("hi").run()
+    assert not at.exception
+    history = at.session_state["chat_history"]
+    assert history[-1] == {"role": "assistant", "content": "This is mock response for test. "}
+    assert at.session_state["chat_reasoning"] == {2: ("This is mock response for test. ", "I am thinking... ")}
+    assert at.status[0].proto.expanded is False
+
+
+def test_reasoning_is_shown_again_on_rerun_and_dropped_when_history_changes(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "chat_with_resoning.py"))
+    at.run()
+    at.chat_input[0].set_value("hi").run()
+    at.run()
+    assert not at.exception
+    assert len(at.status) == 1
+    assert at.status[0].proto.expanded is False
+    assert at.status[0].markdown[0].value.strip() == "I am thinking..."
+
+    # 其他页面重置了共享的 chat_history
+    at.session_state["chat_history"] = [{"role": "assistant", "content": "How can I help you?"}, {"role": "user", "content": "x"}, {"role": "assistant", "content": "other"}]
+    at.run()
+    assert len(at.status) == 0
+    assert at.session_state["chat_reasoning"] == {}
@@ -0,0 +1,51 @@
+import json
+import os
+
+from modules import context_budget, model_prices
+
+
+def _msg(role, text, **extra):
+    return {"role": role, "content": text, **extra}
+
+
+def test_unknown_model_is_sent_unchanged(monkeypatch):
+    monkeypatch.setattr(context_budget, "max_input_tokens", lambda model: None)
+    messages = [_msg("user", "hi " * 1000)]
+    assert context_budget.fit_messages(messages, "unknown") == messages
+
+
+def test_drops_oldest_turns_but_keeps_system_and_latest(monkeypatch):
+    monkeypatch.setattr(context_budget, "max_input_tokens", lambda model: 300)
+    tool_call = {"id": "c1", "type": "function", "function": {"name": "f", "arguments": "{}"}}
+    messages = [
+        _msg("system", "be brief"),
+        _msg("user", "a" * 40),
+        _msg("assistant", None, tool_calls=[tool_call]),
+        _msg("tool", "b" * 800, tool_call_id="c1"),
+        _msg("user", "latest question"),
+    ]
+    fitted = context_budget.fit_messages(messages, "m", reserve=100)
+    assert fitted[0]["role"] == "system"
+    assert fitted[-1]["content"] == "latest question"
+    # tool 消息与发起调用的 assistant 消息一起丢弃, 不会留下孤立的 tool 消息
+    assert all(m["role"] != "tool" for m in fitted)
+    assert all(not m.get("tool_calls") for m in fitted)
+    assert sum(context_budget.count_message_tokens(m) for m in fitted) <= 200
+    assert context_budget.budget_stats()["last"]["dropped_messages"] == 3
+
+
+def test_image_parts_count_as_fixed_tokens():
+    content = [{"type": "text", "text": "abcd"}, {"type": "image_ref", "image_ref": {"sha256": "x", "mime": "image/png"}}]
+    tokens = context_budget.count_message_tokens({"role": "user", "content": content})
+    assert tokens == context_budget.MESSAGE_OVERHEAD + context_budget.count_text_tokens("abcd") + context_budget.IMAGE_TOKENS
+
+
+def test_context_windows_follow_the_data_file(tmp_path, monkeypatch):
+    path = tmp_path / "prices.json"
+    monkeypatch.setattr(model_prices, "MODEL_DATA_PATH", str(path))
+    path.write_text(json.dumps({"m": {"max_input_tokens": 1000}}))
+    assert context_budget.max_input_tokens("m") == 1000
+    path.write_text(json.dumps({"m": {"max_input_tokens": 2000000}}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert context_budget.max_input_tokens("m") == 2000000
@@ -0,0 +1,75 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import cost_projection
+
+PRICES = pd.DataFrame({
+    "模型名称": ["cheap", "pricey"],
+    "提供商": ["a", "b"],
+    "输入价格(每百万tokens)": [1.0, 10.0],
+    "输出价格(每百万tokens)": [2.0, 30.0],
+})
+REQUESTS = [{"input_tokens": 1000, "output_tokens": 100}, {"input_tokens": 3000, "output_tokens": 500}]
+
+
+def test_totals_and_percentiles():
+    result, summary = cost_projection.project_costs(pd.DataFrame(REQUESTS), PRICES)
+    assert summary == {"requests": 2, "input_tokens": 4000, "output_tokens": 600}
+    assert result["模型名称"].tolist() == ["cheap", "pricey"]
+    assert result["总成本($)"].tolist() == pytest.approx([4000e-6 + 600 * 2e-6, 4000 * 10e-6 + 600 * 30e-6])
+    # 分位数为对数分桶的近似值, 相对误差在一个桶以内
+    assert result["P99 每请求成本($)"][0] == pytest.approx(3000e-6 + 500 * 2e-6, rel=0.05)
+
+
+def test_chunked_reads_match_a_single_pass(tmp_path):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"prompt_tokens": rng.integers(0, 5000, 1000), "completion_tokens": rng.integers(0, 800, 1000)})
+    path = tmp_path / "log.csv"
+    frame.to_csv(path, index=False)
+    chunks = list(cost_projection.iter_workload(str(path), read_rows=300))
+    assert len(chunks) == 4
+    assert sum(int(i.sum()) for i, _ in chunks) == int(frame["prompt_tokens"].sum())
+
+
+@pytest.mark.parametrize("name, text", [
+    ("log.jsonl", "\n".join(json.dumps(r) for r in REQUESTS)),
+    ("log.json", json.dumps(REQUESTS)),
+])
+def test_json_and_json_lines(name, text):
+    upload = io.BytesIO(text.encode())
+    upload.name = name
+    _, summary = cost_projection.project_costs(upload, PRICES)
+    assert summary["requests"] == 2
+
+
+def test_missing_columns_do_not_echo_the_file():
+    with pytest.raises(ValueError) as e:
+        list(cost_projection.iter_workload(pd.DataFrame({"secret_column": [1]})))
+    assert "secret_column" not in str(e.value)
+
+
+def test_server_files_are_confined_to_the_workload_dir(tmp_path, monkeypatch):
+    root = tmp_path / "workloads"
+    (root / "daily").mkdir(parents=True)
+    (root / "daily" / "log.csv").write_text("input_tokens,output_tokens\n1,2\n")
+    (root / "notes.txt").write_text("x")
+    (tmp_path / "outside.csv").write_text("input_tokens,output_tokens\n1,2\n")
+    (root / "link.csv").symlink_to(tmp_path / "outside.csv")
+    monkeypatch.setattr(cost_projection, "WORKLOAD_DIR", str(root))
+
+    assert cost_projection.workload_files() == ["daily/log.csv"]
+    assert cost_projection.resolve_workload("daily/log.csv") == (root / "daily" / "log.csv").resolve()
+    for name in ["../outside.csv", "link.csv", str(tmp_path / "outside.csv"), "notes.txt", "missing.csv"]:
+        with pytest.raises(ValueError):
+            cost_projection.resolve_workload(name)
+
+
+def test_server_files_are_disabled_without_a_workload_dir(monkeypatch):
+    monkeypatch.setattr(cost_projection, "WORKLOAD_DIR", None)
+    assert cost_projection.workload_files() == []
+    with pytest.raises(ValueError):
+        cost_projection.resolve_workload("/etc/passwd")
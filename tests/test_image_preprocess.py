@@ -0,0 +1,38 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from modules import image_preprocess
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    images = []
+    monkeypatch.setattr(image_preprocess, "_memo", image_preprocess.OrderedDict())
+    monkeypatch.setattr(image_preprocess, "put_image", lambda data, mime: images.append((data, mime)) or len(images) - 1)
+    return images
+
+
+def _noise(mode, size):
+    buffered = io.BytesIO()
+    Image.frombytes(mode, size, os.urandom(size[0] * size[1] * len(mode))).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+@pytest.mark.parametrize("mode, mime", [("RGB", "image/jpeg"), ("RGBA", "image/png")])
+def test_encoded_image_meets_size_target(stored, mode, mime):
+    image_preprocess.preprocess_image(_noise(mode, (3000, 1000)))
+    data, stored_mime = stored[0]
+    assert stored_mime == mime
+    assert len(data) <= image_preprocess.TARGET_BYTES
+    width, height = Image.open(io.BytesIO(data)).size
+    assert max(width, height) <= image_preprocess.MAX_LONG_SIDE
+    assert min(width, height) <= image_preprocess.MAX_SHORT_SIDE
+
+
+def test_same_image_is_processed_once(stored):
+    data = _noise("RGB", (64, 64))
+    assert image_preprocess.preprocess_image(data) == image_preprocess.preprocess_image(data) == 0
+    assert len(stored) == 1
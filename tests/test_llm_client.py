@@ -0,0 +1,23 @@
+from modules import llm_client
+
+
+def test_get_client_reuses_and_keeps_evicted_open(monkeypatch):
+    llm_client.close_clients()
+    monkeypatch.setattr(llm_client, "MAX_CLIENTS", 2)
+    first = llm_client.get_client(api_key="k1")
+    assert llm_client.get_client(api_key="k1") is first
+    llm_client.get_client(api_key="k2")
+    llm_client.get_client(api_key="k3")
+    # k1 最久未使用, 被淘汰但不关闭, 仍在使用它的调用方不受影响
+    assert not first._client.is_closed
+    assert llm_client.get_client(api_key="k1") is not first
+    assert llm_client.pool_stats()["evicted"] >= 1
+    llm_client.close_clients()
+
+
+def test_pool_stats_only_reads_existing_clients():
+    llm_client.close_clients()
+    before = llm_client.pool_stats()
+    assert before["clients"] == 0
+    assert before["connections"] == 0
+    assert llm_client.pool_stats()["created"] == before["created"]
@@ -0,0 +1,30 @@
+import importlib.util
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location("load_test", os.path.join(ROOT, "scripts", "load_test.py"))
+load_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_test)
+
+PAGE = """
+import streamlit as st
+st.exception(Exception("rendered on purpose"))
+if st.button("boom"):
+    raise RuntimeError("boom")
+"""
+
+
+def test_rendered_exceptions_are_not_errors(tmp_path):
+    page = tmp_path / "page.py"
+    page.write_text("import streamlit as st\nst.exception(Exception('rendered on purpose'))\nst.checkbox('x')\n")
+    timings, errors = load_test.run_session(str(page), steps=2, timeout=30)
+    assert errors == []
+    assert len(timings) == 3
+
+
+def test_uncaught_exceptions_end_the_session(tmp_path):
+    page = tmp_path / "page.py"
+    page.write_text(PAGE)
+    timings, errors = load_test.run_session(str(page), steps=3, timeout=30)
+    assert errors == ["boom"]
+    assert len(timings) == 2
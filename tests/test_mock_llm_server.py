@@ -0,0 +1,55 @@
+import importlib.util
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from argparse import Namespace
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location("mock_llm_server", os.path.join(ROOT, "scripts", "mock_llm_server.py"))
+mock_llm_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mock_llm_server)
+
+BODY = {
+    "model": "gpt-4o-mini",
+    "messages": [{"role": "user", "content": "Tokyo"}],
+    "tools": [{"type": "function", "function": {"name": "get_current_weather", "parameters": {"required": ["location"]}}}],
+}
+
+
+def test_synthesized_ids_are_stable_for_a_seed():
+    first = mock_llm_server.assemble(mock_llm_server.synthesize(BODY, seed=1))
+    again = mock_llm_server.assemble(mock_llm_server.synthesize(BODY, seed=1))
+    other = mock_llm_server.assemble(mock_llm_server.synthesize(BODY, seed=2))
+    tool_call = first["choices"][0]["message"]["tool_calls"][0]
+    assert tool_call == again["choices"][0]["message"]["tool_calls"][0]
+    assert tool_call["id"] != other["choices"][0]["message"]["tool_calls"][0]["id"]
+    assert json.loads(tool_call["function"]["arguments"]) == {"location": "Tokyo"}
+
+
+@pytest.fixture
+def record_server(tmp_path, monkeypatch):
+    def fail(request):
+        raise urllib.error.HTTPError(request.full_url, 429, "Too Many Requests", {"Content-Type": "application/json"}, io.BytesIO(b'{"error": {"message": "rate limited"}}'))
+
+    monkeypatch.setattr(mock_llm_server.urllib.request, "urlopen", fail)
+    handler = type("Handler", (mock_llm_server.Handler,), {})
+    handler.config = Namespace(record=True, upstream="http://upstream.invalid/v1", sessions=str(tmp_path), verbose=False)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+def test_record_relays_upstream_errors(record_server, tmp_path):
+    request = urllib.request.Request(record_server + "/chat/completions", data=json.dumps(BODY).encode(), headers={"Content-Type": "application/json"})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request)
+    assert error.value.code == 429
+    assert json.loads(error.value.read()) == {"error": {"message": "rate limited"}}
+    assert os.listdir(tmp_path) == []
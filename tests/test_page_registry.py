@@ -0,0 +1,33 @@
+import os
+
+from modules import page_registry
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("import streamlit as st\n")
+
+
+def test_discovery_is_cached_until_the_directory_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_registry, "CHECK_INTERVAL", 0)
+    _touch(tmp_path / "chat.py")
+    _touch(tmp_path / "sub" / "chart_x.py")
+    pages_dir = str(tmp_path)
+    first = page_registry.cached_pages(pages_dir)
+    assert [url for _, url in first["Chat"]] == ["chat"]
+    assert [url for _, url in first["Chart"]] == ["sub_chart_x"]
+    assert page_registry.cached_pages(pages_dir) is first
+
+    _touch(tmp_path / "other.py")
+    stat = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = page_registry.cached_pages(pages_dir)
+    assert second is not first
+    assert [url for _, url in second["Other"]] == ["other"]
+
+
+def test_navigation_config_builds_fresh_pages_each_run(tmp_path):
+    _touch(tmp_path / "chat.py")
+    first = page_registry.navigation_config(str(tmp_path))
+    second = page_registry.navigation_config(str(tmp_path))
+    assert first["Chat"][0] is not second["Chat"][0]
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.price_index import PriceIndex
+
+
+@pytest.fixture
+def index():
+    df = pd.DataFrame({
+        "模型名称": ["gpt-4o", "gpt-4o-mini", "claude-3-haiku", "text-embedding-3", "my-gpt-4o-tuned"],
+        "提供商": pd.Categorical(["openai", "openai", "anthropic", "openai", "azure"]),
+        "输入价格(每百万tokens)": [2.5, 0.15, 0.25, 0.02, 5.0],
+        "模式": pd.Categorical(["chat", "chat", "chat", "embedding", "chat"]),
+    })
+    return PriceIndex(df)
+
+
+def test_filter_rows_is_sorted_by_price_descending(index):
+    assert index.filter_rows().tolist() == [4, 0, 2, 1, 3]
+    assert index.filter_rows("openai", "chat").tolist() == [0, 1]
+    assert index.filter_rows("missing").tolist() == []
+
+
+def test_search_ranks_exact_then_prefix_then_position(index):
+    assert index.search(query=" GPT-4o ").tolist() == [0, 1, 4]
+    assert index.search("openai", "chat", "4o").tolist() == [0, 1]
+
+
+def test_search_checks_substrings_not_just_ngrams(index):
+    # 3-gram 只用来筛候选, 最终结果必须包含完整子串
+    assert index.search(query="4o-tuned").tolist() == [4]
+    assert index.search(query="o-4o").tolist() == []
+
+
+def test_results_are_cached_and_read_only(index):
+    rows = index.filter_rows("openai")
+    assert index.filter_rows("openai") is rows
+    with pytest.raises(ValueError):
+        rows[0] = 1
+    stats = index.stats()
+    assert stats["rows"] == 5 and stats["hits"] == 1 and stats["misses"] == 1
+    assert isinstance(rows, np.ndarray)
@@ -0,0 +1,28 @@
+from modules import rerun_stats
+
+
+def test_interrupted_run_is_closed_by_the_next_run(session_state, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rerun_stats.time, "perf_counter", lambda: now[0])
+    rerun_stats.begin_run()
+    now[0] += 0.5
+    # 没有执行到 end_run 就被打断
+    rerun_stats.begin_run()
+    now[0] += 0.25
+    rerun_stats.end_run()
+    current = rerun_stats.turn_stats()["current"]
+    assert current == {"runs": 2, "interrupted": 1, "script_seconds": 0.75}
+
+
+def test_new_turn_archives_previous_runs(session_state, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(rerun_stats.time, "perf_counter", lambda: now[0])
+    for _ in range(3):
+        rerun_stats.begin_run()
+        now[0] += 1
+        rerun_stats.end_run()
+    rerun_stats.begin_run()
+    rerun_stats.new_turn()
+    stats = rerun_stats.turn_stats()
+    assert stats["turns"] == [{"runs": 3, "interrupted": 0, "script_seconds": 3.0}]
+    assert stats["current"]["runs"] == 1
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from modules import session_memory
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(session_memory, "_sessions", {})
+    monkeypatch.setattr(session_memory, "MEASURE_INTERVAL", 0)
+    return session_memory._sessions
+
+
+def _history(messages, size):
+    return [{"role": "user", "content": "x" * size} for _ in range(messages)]
+
+
+def test_shared_objects_are_counted_once():
+    big = "x" * 100_000
+    sizes = session_memory.enforce("s", {"a": [big], "b": [big]})
+    assert sizes["a"] + sizes["b"] < 2 * len(big)
+
+
+def test_trims_oldest_messages_and_keeps_widget_state():
+    state = {"chat_history": _history(20, 100_000), "checked": True, "your_name": "x" * 300_000}
+    sizes = session_memory.enforce("s", state, session_cap=1 * MB)
+    assert sum(sizes.values()) <= 1 * MB
+    assert state["checked"] is True and len(state["your_name"]) == 300_000
+    assert 1 <= len(state["chat_history"]) < 20
+
+
+def test_never_starts_on_an_orphan_tool_message():
+    history = [
+        {"role": "user", "content": "x" * 200_000},
+        {"role": "assistant", "content": None, "tool_calls": []},
+        {"role": "tool", "content": "y" * 200_000},
+        {"role": "user", "content": "latest"},
+    ]
+    state = {"chat_history": history}
+    session_memory.enforce("s", state, session_cap=300_000)
+    assert state["chat_history"][0]["role"] != "tool"
+    assert state["chat_history"][-1]["content"] == "latest"
+
+
+def test_keeps_reasoning_aligned_with_history():
+    state = {"chat_history": _history(10, 100_000), "chat_reasoning": {3: "r3", 9: "r9"}}
+    session_memory.enforce("s", state, session_cap=500_000)
+    dropped = 10 - len(state["chat_history"])
+    assert dropped > 3
+    assert state["chat_reasoning"] == {9 - dropped: "r9"}
+
+
+def test_process_cap_only_squeezes_the_largest_session():
+    small = {"messages": _history(5, 100_000)}
+    session_memory.enforce("small", small, session_cap=64 * MB, process_cap=4 * MB)
+    large = {"messages": _history(60, 100_000)}
+    session_memory.enforce("large", large, session_cap=64 * MB, process_cap=4 * MB)
+    assert len(small["messages"]) == 5
+    total = sum(sum(e["sizes"].values()) for e in session_memory._sessions.values())
+    assert total <= 4 * MB
+
+
+def test_cap_has_a_floor_per_session(registry):
+    registry["other"] = {"sizes": {"messages": 100 * MB}, "measured_at": 0, "evicted": [], "cap": 0}
+    # 小会话不受影响, 超出的部分全部由大会话承担
+    assert session_memory.cap_for("s", 2 * MB, session_cap=64 * MB, process_cap=10 * MB) == 8 * MB
+    assert session_memory.cap_for("s", 2 * MB, session_cap=64 * MB, process_cap=1) == session_memory.MIN_SESSION_CAP
+
+
+def test_chat_pages_enforce_the_cap_without_page_main(registry):
+    # 直接运行页面 (main.py 多页面模式), 不经过 page_main.py
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "chat.py"))
+    at.run()
+    at.run()
+    assert not at.exception
+    (entry,) = registry.values()
+    assert "chat_history" in entry["sizes"]
@@ -0,0 +1,64 @@
+from modules import stream_metrics
+from modules.tool_stream import ToolCalls
+
+
+def test_empty_chunks_do_not_count_as_first_token(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(stream_metrics.time, "perf_counter", lambda: now[0])
+
+    def stream():
+        now[0] = 0.1
+        yield ""  # 只有 role 的 chunk
+        now[0] = 0.2
+        yield {"reasoning_content": ""}
+        now[0] = 0.5
+        yield "Hel"
+        now[0] = 0.7
+        yield "lo"
+        now[0] = 0.9
+        yield ""
+
+    assert list(stream_metrics.timed_stream(stream(), "test-empty", "m")) == ["", {"reasoning_content": ""}, "Hel", "lo", ""]
+    record = stream_metrics.records()[-1]
+    assert record["ttft_seconds"] == 0.5
+    assert record["chunks"] == 2
+    assert round(record["max_gap_seconds"], 6) == 0.2
+    assert round(record["chunks_per_second"], 6) == round(2 / 0.4, 6)
+
+
+def test_timed_reads_model_from_arguments():
+    @stream_metrics.timed("test-decorated")
+    def chat(messages, model_params):
+        yield "x"
+
+    list(chat([], {"model": "gpt-x"}))
+    record = stream_metrics.records()[-1]
+    assert (record["name"], record["model"], record["chunks"]) == ("test-decorated", "gpt-x", 1)
+    assert any(row["name"] == "test-decorated" for row in stream_metrics.summary())
+
+
+def test_record_is_closed_when_tool_calls_are_yielded(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(stream_metrics.time, "perf_counter", lambda: now[0])
+
+    def stream():
+        now[0] = 0.02
+        tool_calls = ToolCalls([{"id": "c1"}])
+        tool_calls.first_delta_at = 0.02
+        now[0] = 0.05
+        yield tool_calls
+
+    # 保持生成器存活, 和页面一样只读到 tool_call 列表为止
+    response = stream_metrics.timed_stream(stream(), "test-tools", "m")
+    for item in response:
+        if isinstance(item, list):
+            break
+    # 调用方停止迭代后执行工具, 不应计入这次请求
+    now[0] = 0.55
+    record = stream_metrics.records()[-1]
+    assert record["name"] == "test-tools"
+    assert record["total_seconds"] == 0.05
+    assert record["ttft_seconds"] == 0.02
+    assert record["tool_calls"] == 1
+    response.close()
+    assert stream_metrics.records()[-1] is record
@@ -0,0 +1,49 @@
+import time
+
+from modules.stream_render import CoalescingWriter, write_channels
+
+
+class Placeholder:
+    def __init__(self):
+        self.writes = []
+
+    def markdown(self, text):
+        self.writes.append(text)
+
+
+def test_coalesces_chunks_within_the_interval():
+    placeholder = Placeholder()
+    writer = CoalescingWriter(placeholder, interval=10)
+    for chunk in "abcdef":
+        writer.append(chunk)
+    assert placeholder.writes == ["a"]
+    assert writer.text == "abcdef"
+    assert writer.flush() == "abcdef"
+    assert placeholder.writes == ["a", "abcdef"]
+
+
+def test_buffered_text_is_flushed_when_the_stream_stalls():
+    placeholder = Placeholder()
+    writer = CoalescingWriter(placeholder, interval=0.05)
+    writer.append("a")
+    writer.append("b")
+    assert placeholder.writes == ["a"]
+    time.sleep(0.2)
+    assert placeholder.writes == ["a", "ab"]
+    writer.flush()
+    assert placeholder.writes == ["a", "ab"]
+
+
+def test_large_buffers_flush_immediately():
+    placeholder = Placeholder()
+    writer = CoalescingWriter(placeholder, interval=10, flush_chars=4)
+    writer.append("a")
+    writer.append("bcde")
+    assert placeholder.writes == ["a", "abcde"]
+
+
+def test_write_channels_routes_chunks():
+    placeholders = {"reasoning": Placeholder(), "answer": Placeholder()}
+    stream = [{"reasoning_content": "think"}, "ans", "wer"]
+    route = lambda chunk: ("reasoning", chunk["reasoning_content"]) if isinstance(chunk, dict) else ("answer", chunk)
+    assert write_channels(stream, placeholders, route) == {"reasoning": "think", "answer": "answer"}
@@ -0,0 +1,40 @@
+from modules.tool_cache import ToolCache, cacheable
+
+
+def test_cacheable_normalizes_arguments_and_defaults():
+    cache = ToolCache()
+    calls = []
+
+    @cacheable(ttl=60, cache=cache)
+    def weather(location, unit="fahrenheit"):
+        calls.append(location)
+        return f"{location}:{unit}"
+
+    assert weather("Tokyo") == "Tokyo:fahrenheit"
+    assert weather(" tokyo ", unit="fahrenheit") == "Tokyo:fahrenheit"
+    assert weather(location="TOKYO") == "Tokyo:fahrenheit"
+    assert weather("Tokyo", "celsius") == "Tokyo:celsius"
+    assert calls == ["Tokyo", "Tokyo"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("modules.tool_cache.time.monotonic", lambda: now[0])
+    cache = ToolCache()
+    cache.set("k", "v", ttl=10)
+    assert cache.get("k")[1] == "v"
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction():
+    cache = ToolCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a")[1] == 1
+    assert cache.get("c")[1] == 3
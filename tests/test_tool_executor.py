@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from modules import tool_executor
+
+
+def _tool_call(call_id, name, **args):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+def test_calls_run_concurrently_and_keep_order():
+    def slow(value, delay):
+        time.sleep(delay)
+        return value
+
+    calls = [_tool_call("a", "slow", value="a", delay=0.3), _tool_call("b", "slow", value="b", delay=0.1)]
+    start = time.monotonic()
+    results = tool_executor.execute_tool_calls(calls, {"slow": slow})
+    assert time.monotonic() - start < 0.55
+    assert [message["content"] for _, message in results] == ["a", "b"]
+    assert [message["tool_call_id"] for _, message in results] == ["a", "b"]
+
+
+def test_errors_become_tool_messages():
+    def broken():
+        raise ValueError("boom")
+
+    calls = [
+        _tool_call("a", "broken"),
+        _tool_call("b", "missing"),
+        {"id": "c", "type": "function", "function": {"name": "broken", "arguments": "{"}},
+    ]
+    contents = [message["content"] for _, message in tool_executor.execute_tool_calls(calls, {"broken": broken})]
+    assert contents[0] == "工具 broken 执行错误: boom"
+    assert contents[1] == "Error: unknown tool missing."
+    assert contents[2] == "Error: Invalid arguments format for tool broken."
+
+
+def test_tool_result_keeps_error_status():
+    def broken():
+        raise ValueError("boom")
+
+    call = _tool_call("a", "broken")
+    _, future = tool_executor.submit_tool_call(call, {"broken": broken})
+    with pytest.raises(ValueError):
+        tool_executor.tool_result(call, future)
+
+
+def test_timeout_cancels_queued_calls(monkeypatch):
+    monkeypatch.setattr(tool_executor, "_executor", ThreadPoolExecutor(max_workers=1))
+    release = threading.Event()
+    ran = []
+
+    def hang():
+        release.wait(5)
+        return "late"
+
+    def quick():
+        ran.append(True)
+        return "ok"
+
+    calls = [_tool_call("a", "hang"), _tool_call("b", "quick")]
+    results = tool_executor.execute_tool_calls(calls, {"hang": hang, "quick": quick}, timeout=0.2)
+    release.set()
+    tool_executor._executor.shutdown(wait=True)
+    assert [message["content"] for _, message in results] == ["Error: tool hang timed out.", "Error: tool quick timed out."]
+    # 排队中的调用被取消, 没有在超时后继续占用线程
+    assert ran == []
+
+
+def test_remaining_timeout_bounds_tool_clients():
+    seen = []
+
+    def tool():
+        seen.append(tool_executor.remaining_timeout())
+        return "ok"
+
+    tool_executor.execute_tool_calls([_tool_call("a", "tool")], {"tool": tool}, timeout=5)
+    assert 0 < seen[0] <= 5
+    assert tool_executor.remaining_timeout(default=7) == 7
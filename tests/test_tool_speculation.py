@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from modules import tool_speculation
+from modules.tool_executor import execute_tool_calls, tool_result
+
+
+def _tool_call(call_id, name, **args):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+def test_only_side_effect_free_tools_are_speculated():
+    ran = []
+
+    @tool_speculation.side_effect_free
+    def lookup(key):
+        ran.append(key)
+        return key.upper()
+
+    def send(key):
+        ran.append("send")
+        return "sent"
+
+    calls = [_tool_call("spec-1", "lookup", key="a"), _tool_call("spec-2", "send", key="b")]
+    hooks = {"lookup": lookup, "send": send}
+    tool_speculation.speculate(calls, hooks)
+    claimed = tool_speculation.claim(calls)
+    assert list(claimed) == ["spec-1"]
+    results = execute_tool_calls(calls, hooks, submitted=claimed)
+    assert [message["content"] for _, message in results] == ["A", "sent"]
+    assert ran.count("a") == 1
+
+
+def test_failed_speculation_keeps_error():
+    @tool_speculation.side_effect_free
+    def broken():
+        raise RuntimeError("down")
+
+    call = _tool_call("spec-3", "broken")
+    tool_speculation.speculate([call], {"broken": broken})
+    _, future = tool_speculation.claim([call])["spec-3"]
+    with pytest.raises(RuntimeError):
+        tool_result(call, future)
+
+
+def test_discard_drops_pending_speculation():
+    @tool_speculation.side_effect_free
+    def lookup():
+        return "x"
+
+    call = _tool_call("spec-4", "lookup")
+    tool_speculation.speculate([call], {"lookup": lookup})
+    tool_speculation.discard([call])
+    assert tool_speculation.claim([call]) == {}
+
+
+def test_same_tool_call_id_in_two_sessions_does_not_collide(monkeypatch):
+    @tool_speculation.side_effect_free
+    def lookup(key):
+        return key
+
+    ctx = SimpleNamespace(session_id="a")
+    monkeypatch.setattr(tool_speculation, "get_script_run_ctx", lambda: ctx)
+    before = tool_speculation.speculation_stats()
+
+    tool_speculation.speculate([_tool_call("same", "lookup", key="a")], {"lookup": lookup})
+    ctx.session_id = "b"
+    tool_speculation.speculate([_tool_call("same", "lookup", key="b")], {"lookup": lookup})
+    _, future_b = tool_speculation.claim([_tool_call("same", "lookup")])["same"]
+    ctx.session_id = "a"
+    _, future_a = tool_speculation.claim([_tool_call("same", "lookup")])["same"]
+
+    assert (future_a.result(), future_b.result()) == ("a", "b")
+    after = tool_speculation.speculation_stats()
+    assert after["wasted"] == before["wasted"]
+    assert after["saved"] == before["saved"] + 2
@@ -0,0 +1,46 @@
+import json
+from types import SimpleNamespace
+
+from modules.tool_stream import ToolCallAssembler
+
+
+def _delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def test_assembles_fragments_and_dispatches_each_call_once_complete():
+    dispatched = []
+    assembler = ToolCallAssembler(on_tool_call=lambda tc: dispatched.append(tc["id"]))
+    assembler.feed([_delta(0, id="call_0", name="get_weather", arguments='{"location": "To')])
+    assert dispatched == []
+    completed = assembler.feed([_delta(0, arguments='kyo \\"}\\" {"}')])
+    assert [tc["id"] for tc in completed] == ["call_0"]
+    assert dispatched == ["call_0"]
+    assembler.feed([_delta(1, id="call_1", name="get_weather", arguments='{"location": [1, {"a": 2}]')])
+    assert dispatched == ["call_0"]
+    assembler.feed([_delta(1, arguments="}")])
+    assert dispatched == ["call_0", "call_1"]
+
+    tool_calls = assembler.finish()
+    assert dispatched == ["call_0", "call_1"]
+    assert len(tool_calls) == 2
+    assert json.loads(tool_calls[0]["function"]["arguments"]) == {"location": 'Tokyo "}" {'}
+    assert json.loads(tool_calls[1]["function"]["arguments"]) == {"location": [1, {"a": 2}]}
+    assert tool_calls[0]["function"]["name"] == "get_weather"
+
+
+def test_escape_split_across_fragments():
+    assembler = ToolCallAssembler()
+    assembler.feed([_delta(0, id="c", name="f", arguments='{"a": "x\\')])
+    assert assembler.feed([_delta(0, arguments='"}')]) == []
+    assert [tc["id"] for tc in assembler.feed([_delta(0, arguments='"}')])] == ["c"]
+
+
+def test_finish_flushes_incomplete_calls():
+    dispatched = []
+    assembler = ToolCallAssembler(on_tool_call=dispatched.append)
+    assembler.feed([_delta(0, id="c", name="no_args")])
+    tool_calls = assembler.finish()
+    assert dispatched == tool_calls
+    assert tool_calls[0]["function"]["arguments"] == ""
+    assert tool_calls.assembly_seconds >= 0
@@ -0,0 +1,96 @@
+import socket
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from modules import tts
+
+
+class _Response:
+    def __init__(self, chunks, gate):
+        self.chunks = chunks
+        self.gate = gate
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_bytes(self, chunk_size):
+        # 第一块之后停住, 直到测试放行, 模拟合成还在进行
+        for i, chunk in enumerate(self.chunks):
+            if i == 1:
+                self.gate.wait(5)
+            yield chunk
+
+
+class _Client:
+    def __init__(self, chunks):
+        self.gate = threading.Event()
+        self.chunks = chunks
+        speech = type("Speech", (), {})()
+        speech.with_streaming_response = type("Streaming", (), {})()
+        speech.with_streaming_response.create = lambda **kwargs: _Response(self.chunks, self.gate)
+        self.audio = type("Audio", (), {"speech": speech})()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def media_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), tts._MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_partial_audio_is_streamed_while_synthesizing(media_server):
+    client = _Client([b"a" * 10, b"b" * 10])
+    key = tts.start_synthesis(client, "hello", "alloy", "tts-1")
+    response = urllib.request.urlopen(f"{media_server}/tts/{key}.mp3", timeout=5)
+    assert response.read(10) == b"a" * 10
+    client.gate.set()
+    assert response.read() == b"b" * 10
+    assert open(tts.wait_audio(key, timeout=5), "rb").read() == b"a" * 10 + b"b" * 10
+
+
+def test_partial_file_exists_before_synthesis_starts(cache_dir, monkeypatch):
+    monkeypatch.setattr(tts.threading.Thread, "start", lambda self: None)
+    key = tts.start_synthesis(_Client([]), "hi", "alloy", "tts-1")
+    assert (cache_dir / f"{key}.mp3.partial").exists()
+    tts._inflight.pop(key)
+
+
+def test_failed_synthesis_is_reported(cache_dir):
+    client = _Client([b"a"])
+    client.audio.speech.with_streaming_response.create = lambda **kwargs: (_ for _ in ()).throw(RuntimeError("quota"))
+    key = tts.start_synthesis(client, "boom", "alloy", "tts-1")
+    with pytest.raises(RuntimeError, match="quota"):
+        tts.wait_audio(key, timeout=5)
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_no_stream_url_for_remote_browsers_without_media_url(monkeypatch):
+    monkeypatch.setattr(tts, "MEDIA_URL", None)
+    assert tts.audio_url("0" * 64) is None
+
+
+def test_media_server_falls_back_when_port_is_taken(monkeypatch):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        monkeypatch.setattr(tts, "MEDIA_HOST", "127.0.0.1")
+        monkeypatch.setattr(tts, "MEDIA_PORT", taken.getsockname()[1])
+        tts.start_media_server.clear()
+        try:
+            assert tts.start_media_server() is None
+        finally:
+            tts.start_media_server.clear()